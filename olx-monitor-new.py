@@ -1,19 +1,1827 @@
 # filepath: /Users/dyli/Documents/GitHub/olx-bot/olx-monitor-new.py
-import requests
-from bs4 import BeautifulSoup
-import re
 import time
+STARTUP_STARTED = time.perf_counter()  # Reference point for the start-up timing report
+
+import re
 from datetime import datetime
 import urllib.parse
 import json
 import os
-from telegram import Bot
-from telegram.error import TelegramError
 import asyncio
 import random  # Add this import for random wait times
+import copy
+import pickle
+import importlib
+import importlib.util
+import codecs
+import html.parser
+import threading
+import queue
+import sys
+import hashlib
+import bisect
+import platform
+import contextlib
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access"""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+# Heavy dependencies are deferred until they're used so the first poll starts sooner
+requests = LazyModule('requests')
+bs4 = LazyModule('bs4')
+telegram = LazyModule('telegram')
+sqlite3 = LazyModule('sqlite3')
+http_server = LazyModule('http.server')
+
+
+# Set from the log_level setting - [DEBUG] output is skipped entirely, message formatting included, unless it's on
+DEBUG = False
+
+
+# Promoted ads carry a badge class whose 'Wyróżnione' label comes from a shared style rule
+PROMOTED_BADGE = re.compile(r"\.(css-[\w-]+)::after\{content:'Wyróżnione'")
+
+
+# Listing page text that means the ad has ended
+INACTIVE_MARKERS = ('Ogłoszenie nie jest już dostępne', 'To ogłoszenie jest nieaktywne', 'ogłoszenie zostało usunięte')
+
+# Sellers' usual wording for a reserved item
+RESERVED_MARKERS = re.compile(r'zarezerwowan|rezerwacj', re.I)
+
+# Listing ID at the end of OLX offer URLs, e.g. ...-CID99-ID16bqBr.html
+LISTING_ID = re.compile(r'-ID(\w+)\.html')
+
+# Selector cascades for search result cards, tried in order until one matches
+LISTING_SELECTORS = (
+    {'data-cy': 'l-card'},
+    {'data-testid': 'listing-grid'},
+    {'class': re.compile(r'css-.*')},
+    {'class': re.compile(r'offer-wrapper', re.I)},
+    {'class': re.compile(r'.*listing.*', re.I)}
+)
+TITLE_SELECTORS = (
+    {'data-cy': 'listing-ad-title'},
+    {'data-testid': 'ad-title'},
+    {'class': re.compile(r'title', re.I)}
+)
+PRICE_SELECTORS = (
+    {'data-testid': 'ad-price'},
+    {'data-cy': 'ad-price'},
+    {'class': re.compile(r'price', re.I)}
+)
+TITLE_TAGS = ['h6', 'h5', 'h4', 'h3', 'a']
+PRICE_TAGS = ['p', 'span', 'div']
+
+# The card-level data-cy/data-testid names the cascades look for identify a page's layout.
+# Other names (delivery badges, ad slots, similar searches) come and go with the cards themselves.
+STRUCTURAL_MARKERS = tuple(
+    value for selector in LISTING_SELECTORS + TITLE_SELECTORS + PRICE_SELECTORS
+    for key, value in selector.items() if key.startswith('data-')
+)
+LAYOUT_MARKERS = re.compile(rb'data-(?:cy|testid)="(' + b'|'.join(re.escape(marker.encode()) for marker in STRUCTURAL_MARKERS) + rb')"')
+
+# Which cascade step worked, per layout fingerprint: {'container', 'title', 'price'} -> index.
+# Per process, so each parser worker learns its own copy on its first page.
+EXTRACTION_PLANS = {}
+EXTRACTION_PLANS_MAX = 16
+
+
+def layout_fingerprint(content):
+    """Set of the structural data-cy/data-testid names present on a search page"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return frozenset(LAYOUT_MARKERS.findall(content))
+
+
+def find_listing_title(listing, step):
+    """Title element for one step of the title cascade, None if that step doesn't match"""
+    if step < len(TITLE_SELECTORS):
+        return listing.find(TITLE_TAGS, TITLE_SELECTORS[step])
+    # Fall back to any heading or anchor
+    return listing.find(['h6', 'h5', 'h4', 'h3']) or listing.find('a')
+
+
+def find_listing_price(listing, step):
+    """Price element for one step of the price cascade, None if that step doesn't match"""
+    if step < len(PRICE_SELECTORS):
+        return listing.find(PRICE_TAGS, PRICE_SELECTORS[step])
+    # Fall back to any element with price-like text
+    for elem in listing.find_all(PRICE_TAGS):
+        text = elem.get_text(strip=True)
+        if 'zł' in text or 'PLN' in text:
+            return elem
+    return None
+
+
+def find_with_plan(find_step, listing, plan, key, steps):
+    """Try the step that worked on earlier cards first, then the full cascade, learning the result.
+
+    The last step is a catch-all fallback and is never learned - it would match every later card
+    before the specific selectors got another chance."""
+    learned = plan.get(key)
+    if learned is not None:
+        elem = find_step(listing, learned)
+        if elem is not None:
+            return elem
+    for step in range(steps):
+        if step == learned:
+            continue
+        elem = find_step(listing, step)
+        if elem is not None:
+            if learned is None and step < steps - 1:
+                plan[key] = step
+            return elem
+    return None
+
+
+class Listing:
+    """One search result, created once by the parser and filled in by later pipeline stages.
+
+    Slots keep the per-listing footprint small and stop stages from growing ad-hoc keys."""
+    __slots__ = ('title', 'price_text', 'link', 'promoted', 'position', 'location', 'phone_model', 'price', 'previous_price',
+                 'description')
+
+    def __init__(self, title, price_text, link, promoted=False, position=0, location=''):
+        self.title = title
+        self.price_text = price_text
+        self.link = link
+        self.promoted = promoted
+        self.position = position  # index on the search page
+        self.location = location  # e.g. 'Warszawa, Mokotów'
+        self.phone_model = None
+        self.price = None
+        self.previous_price = None  # set when it's a price drop
+        self.description = ''
+
+    @property
+    def phone_name(self):
+        return self.phone_model or self.title
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        listing = cls(data['title'], data['price_text'], data['link'])
+        for name in cls.__slots__:
+            setattr(listing, name, data.get(name, getattr(listing, name)))
+        return listing
+
+    def __repr__(self):
+        return f"Listing({self.title!r}, {self.price_text!r}, {self.link!r})"
+
+
+def card_location(text):
+    """'Warszawa, Wola - Dzisiaj o 12:34' -> 'Warszawa, Wola'"""
+    return text.partition(' - ')[0].strip()
+
+
+def parse_search_page(content):
+    """Parse raw search page bytes into Listing records (title, price text, link, promoted).
+
+    Kept at module level so it can run inside parser worker processes."""
+    fingerprint = layout_fingerprint(content)
+    plan = EXTRACTION_PLANS.get(fingerprint)
+    if plan is None:
+        if len(EXTRACTION_PLANS) >= EXTRACTION_PLANS_MAX:
+            EXTRACTION_PLANS.pop(next(iter(EXTRACTION_PLANS)))
+        plan = EXTRACTION_PLANS[fingerprint] = {}
+        if DEBUG:
+            print(f"[DEBUG] New page layout ({len(fingerprint)} markers) - discovering extraction plan")
+    
+    soup = bs4.BeautifulSoup(content, 'html.parser')
+    
+    promoted_classes = set()
+    for style in soup.find_all('style', string=re.compile('Wyróżnione')):
+        promoted_classes.update(PROMOTED_BADGE.findall(style.string))
+    
+    # Find listing containers, starting with the selector that worked for this layout before
+    listings = []
+    learned = plan.get('container')
+    for index in sorted(range(len(LISTING_SELECTORS)), key=lambda index: index != learned):
+        selector = LISTING_SELECTORS[index]
+        found = soup.find_all('div', selector)
+        if found:
+            if DEBUG:
+                print(f"[DEBUG] Found {len(found)} listings with selector {selector}")
+            listings = found
+            plan['container'] = index
+            break
+            
+    if not listings:
+        if DEBUG:
+            print("[DEBUG] No listings found with standard selectors. Trying direct link approach...")
+        # Try to find any links to listings directly
+        all_links = soup.find_all('a', href=re.compile(r'/d/oferta/'))
+        if DEBUG and all_links:
+            print(f"[DEBUG] Found {len(all_links)} direct offer links")
+        # If no listings found with standard selectors, try to construct them from links
+        if all_links:
+            # Find common parent elements that might be listing containers
+            for link in all_links[:15]:
+                # Try to find parent div that might be a listing container
+                parent = link
+                for _ in range(3):  # Look up to 3 levels up in the DOM
+                    if parent and parent.name == 'div':
+                        listings.append(parent)
+                        break
+                    parent = parent.parent if parent else None
+    
+    if DEBUG:
+        print(f"[DEBUG] Processing {len(listings)} potential listings")
+    offers = []
+    processed = 0
+    
+    for listing in listings:
+        processed += 1
+        try:
+            # Extract title with multiple approaches
+            title_elem = find_with_plan(find_listing_title, listing, plan, 'title', len(TITLE_SELECTORS) + 1)
+                
+            if not title_elem:
+                if DEBUG:
+                    print(f"[DEBUG] Listing #{processed}: No title element found")
+                continue
+                
+            title = title_elem.get_text(strip=True)
+            
+            # Extract price with multiple approaches
+            price_elem = find_with_plan(find_listing_price, listing, plan, 'price', len(PRICE_SELECTORS) + 1)
+                        
+            price_text = price_elem.get_text(strip=True) if price_elem else ''
+            
+            # Extract link - most important part
+            link = None
+            
+            # Find all links in this listing
+            link_elems = listing.find_all('a', href=True)
+            for link_elem in link_elems:
+                href = link_elem['href']
+                # Check for OLX listing pattern
+                if 'oferta' in href:
+                    link = href
+                    break
+                    
+            if not link:
+                if DEBUG:
+                    print(f"[DEBUG] Listing #{processed}: No link found")
+                continue
+                
+            if link.startswith('/'):
+                link = 'https://www.olx.pl' + link
+                
+            if DEBUG:
+                print(f"[DEBUG] Found listing: '{title[:30]}...' | {price_text} | {link}")
+            
+            promoted = bool(promoted_classes) and listing.find(class_=promoted_classes.__contains__) is not None
+            
+            location_elem = listing.find('p', {'data-testid': 'location-date'})
+            location = card_location(location_elem.get_text(strip=True)) if location_elem else ''
+            
+            offers.append(Listing(title, price_text, link, promoted, position=len(offers), location=location))
+            
+            if len(offers) >= 50:  # Increased from 10 to catch more listings
+                break
+                
+        except Exception as e:
+            if DEBUG:
+                print(f"[DEBUG] Error processing listing #{processed}: {e}")
+            continue
+            
+    if DEBUG:
+        print(f"[DEBUG] Found {len(offers)} valid offers out of {len(listings)} listings")
+    return offers
+
+
+def init_parser_worker(debug=False):
+    """Warm up a parser worker process so the first real page doesn't pay for it"""
+    global DEBUG
+    DEBUG = debug
+    bs4.BeautifulSoup('<html></html>', 'html.parser')
+
+
+def warm_up_parser_worker(_):
+    """No-op task used to spawn the parser workers before the first cycle"""
+    return os.getpid()
+
+
+def response_charset(response):
+    """Charset named in Content-Type, else UTF-8 - requests assumes ISO-8859-1 for text/html without one"""
+    match = re.search(r'charset=["\']?([\w.:-]+)', response.headers.get('Content-Type', ''), re.I)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+
+def supported_accept_encoding():
+    """Accept-Encoding value listing only the encodings urllib3 can decode here"""
+    encodings = ['gzip', 'deflate']
+    # Brotli decoding needs an optional package - don't ask for br if it isn't installed
+    if importlib.util.find_spec('brotli') or importlib.util.find_spec('brotlicffi'):
+        encodings.append('br')
+    return ', '.join(encodings)
+
+
+class SearchPageStreamParser(html.parser.HTMLParser):
+    """Incremental search page parser that produces Listing records card by card as HTML is fed in.
+
+    Falls back to the __PRERENDERED_STATE__ blob if the page has no l-card markup."""
+    TITLE_TAGS = ('h6', 'h5', 'h4', 'h3')
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.completed = []  # offers not yet taken
+        self.cards_seen = 0
+        self.state_blob_parsed = False
+        
+        self.card_depth = 0  # div nesting inside the current card, 0 = outside any card
+        self.card = None
+        self.captures = []  # open text captures: [field, tag, open_count, parts]
+        self.pending_text = []  # text since the last tag - a text node can be split across fed chunks
+        
+        self.raw_tag = None  # inside <style>/<script>
+        self.raw_parts = []
+        self.promoted_classes = set()
+
+    def take_offers(self):
+        """Return the offers completed since the last call"""
+        completed, self.completed = self.completed, []
+        return completed
+
+    def flush_text(self):
+        """Hand the text node that just ended to the open captures, stripped like get_text(strip=True)"""
+        text = ''.join(self.pending_text).strip()
+        self.pending_text = []
+        if text:
+            for capture in self.captures:
+                capture[3].append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if self.pending_text:
+            self.flush_text()
+        if tag in ('style', 'script'):
+            self.raw_tag = tag
+            self.raw_parts = []
+            return
+        
+        attrs = dict(attrs)
+        if self.card_depth == 0:
+            if tag == 'div' and attrs.get('data-cy') == 'l-card':
+                self.card_depth = 1
+                self.card = {'title': None, 'heading': None, 'price': None, 'location': None, 'link': None, 'promoted': False}
+                self.captures = []
+            return
+        
+        if tag == 'div':
+            self.card_depth += 1
+        for capture in self.captures:
+            if capture[1] == tag:
+                capture[2] += 1
+        
+        card = self.card
+        if self.promoted_classes and not card['promoted']:
+            classes = (attrs.get('class') or '').split()
+            card['promoted'] = any(cls in self.promoted_classes for cls in classes)
+        
+        # Same preference order as parse_search_page
+        if card['title'] is None and (attrs.get('data-cy') == 'listing-ad-title' or attrs.get('data-testid') == 'ad-title'):
+            self.captures.append(['title', tag, 1, []])
+        elif card['heading'] is None and tag in self.TITLE_TAGS:
+            self.captures.append(['heading', tag, 1, []])
+        if card['price'] is None and 'ad-price' in (attrs.get('data-testid'), attrs.get('data-cy')):
+            self.captures.append(['price', tag, 1, []])
+        if card['location'] is None and attrs.get('data-testid') == 'location-date':
+            self.captures.append(['location', tag, 1, []])
+        if tag == 'a' and card['link'] is None and 'oferta' in (attrs.get('href') or ''):
+            card['link'] = attrs['href']
+
+    def handle_endtag(self, tag):
+        if self.pending_text:
+            self.flush_text()
+        if tag == self.raw_tag:
+            self.handle_raw_text(''.join(self.raw_parts))
+            self.raw_tag = None
+            self.raw_parts = []
+            return
+        if self.card_depth == 0:
+            return
+        
+        for capture in list(self.captures):
+            if capture[1] == tag:
+                capture[2] -= 1
+                if capture[2] == 0:
+                    self.captures.remove(capture)
+                    if self.card[capture[0]] is None:
+                        self.card[capture[0]] = ''.join(capture[3])
+        
+        if tag == 'div':
+            self.card_depth -= 1
+            if self.card_depth == 0:
+                self.finish_card()
+
+    def handle_data(self, data):
+        if self.raw_tag:
+            self.raw_parts.append(data)
+            return
+        if self.captures:
+            self.pending_text.append(data)
+
+    def handle_raw_text(self, text):
+        if self.raw_tag == 'style':
+            if 'Wyróżnione' in text:
+                self.promoted_classes.update(PROMOTED_BADGE.findall(text))
+        elif self.cards_seen == 0 and '__PRERENDERED_STATE__' in text:
+            self.parse_state_blob(text)
+
+    def finish_card(self):
+        card = self.card
+        self.card = None
+        self.captures = []
+        self.cards_seen += 1
+        
+        link = card['link']
+        if not link:
+            return
+        if link.startswith('/'):
+            link = 'https://www.olx.pl' + link
+        
+        self.completed.append(Listing(card['title'] or card['heading'] or '', card['price'] or '', link, card['promoted'],
+                                      location=card_location(card['location'] or '')))
+
+    def parse_state_blob(self, text):
+        """Build offers from window.__PRERENDERED_STATE__ (a JSON document inside a JS string)"""
+        try:
+            start = text.index('__PRERENDERED_STATE__')
+            line_end = text.find('\n', start)
+            line = text[start:line_end if line_end != -1 else len(text)]
+            literal = line[line.index('"'):line.rindex('"') + 1]
+            state = json.loads(json.loads(literal))
+            ads = state['listing']['listing']['ads']
+        except (ValueError, KeyError, TypeError):
+            return
+        
+        self.state_blob_parsed = True
+        for ad in ads:
+            if not ad.get('url'):
+                continue
+            location = ad.get('location') or {}
+            city_and_district = ', '.join(filter(None, (location.get('cityName'), location.get('districtName'))))
+            self.completed.append(Listing(ad.get('title') or '', (ad.get('price') or {}).get('displayValue') or '', ad['url'],
+                                          bool(ad.get('isPromoted')), location=city_and_district))
+
+
+class Pipeline:
+    """Stages running in their own threads, connected by bounded queues.
+
+    A stage blocks when the queue after it is full, so a burst never holds more than queue_size
+    items between two stages. The source gets a queue of its own, normally a single item, so it
+    reads no further ahead of the first stage than it has to and stop_source() takes effect right
+    away. The output of the last stage is consumed on the caller's thread."""
+    DONE = object()
+
+    def __init__(self, queue_size=32, source_queue_size=1):
+        self.queue_size = queue_size
+        self.source_queue_size = source_queue_size
+        self.stages = []  # (name, func, workers)
+        self.stats = {}  # stage name -> {'in', 'out', 'busy'}
+        self.stats_lock = threading.Lock()
+        self.aborted = threading.Event()  # consumer gone or a stage failed - everything winds down
+        self.source_stopped = threading.Event()  # no more input wanted, in-flight items still finish
+        self.error = None
+
+    def stage(self, name, func, workers=1):
+        """Add a stage - func(item) returns an iterable of outputs, empty to drop the item"""
+        self.stages.append((name, func, workers))
+        self.stats[name] = {'in': 0, 'out': 0, 'busy': 0.0}
+        return self
+
+    def stop_source(self):
+        """Called from a stage that has seen enough, e.g. the watermark"""
+        self.source_stopped.set()
+
+    def put(self, queue_, item):
+        # Keep checking for an abort so a blocked producer can't outlive the consumer
+        while not self.aborted.is_set():
+            try:
+                queue_.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fail(self, error):
+        if self.error is None:
+            self.error = error
+        self.aborted.set()
+
+    def feed(self, source, outbox):
+        try:
+            for item in source:
+                # Checked after handing the item over - the next iteration reads from the network
+                if not self.put(outbox, item) or self.source_stopped.is_set():
+                    break
+        except Exception as e:
+            self.fail(e)
+        finally:
+            # Runs the source generator's cleanup, e.g. closing the response mid-body
+            if hasattr(source, 'close'):
+                source.close()
+            self.put(outbox, self.DONE)
+
+    def work(self, name, func, inbox, outbox, remaining):
+        stats = self.stats[name]
+        while True:
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                if self.aborted.is_set():
+                    return
+                continue
+            if item is self.DONE:
+                # Let sibling workers see it too; the last one out passes it on
+                self.put(inbox, self.DONE)
+                with self.stats_lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    self.put(outbox, self.DONE)
+                return
+            if self.aborted.is_set():
+                return
+            
+            started = time.perf_counter()
+            produced = 0
+            try:
+                for result in func(item):
+                    produced += 1
+                    self.put(outbox, result)
+            except Exception as e:
+                self.fail(e)
+            with self.stats_lock:
+                stats['in'] += 1
+                stats['out'] += produced
+                stats['busy'] += time.perf_counter() - started
+
+    def run(self, source):
+        """Start the stages and yield the last stage's output as it arrives"""
+        queues = [queue.Queue(self.source_queue_size)] + [queue.Queue(self.queue_size) for _ in range(len(self.stages))]
+        threads = [threading.Thread(target=self.feed, args=(iter(source), queues[0]), name='pipeline-source', daemon=True)]
+        for index, (name, func, workers) in enumerate(self.stages):
+            remaining = [workers]
+            threads.extend(
+                threading.Thread(target=self.work, args=(name, func, queues[index], queues[index + 1], remaining),
+                                 name=f'pipeline-{name}', daemon=True)
+                for _ in range(workers)
+            )
+        for thread in threads:
+            thread.start()
+        
+        try:
+            while True:
+                try:
+                    item = queues[-1].get(timeout=0.1)
+                except queue.Empty:
+                    if self.aborted.is_set():
+                        break
+                    continue
+                if item is self.DONE:
+                    break
+                yield item
+        finally:
+            # Winds down anything still running after an early exit
+            self.aborted.set()
+            for thread in threads:
+                thread.join(timeout=5)
+        
+        if self.error is not None:
+            raise self.error
+
+    def summary(self):
+        return ' → '.join(
+            f"{name} {stats['in']}/{stats['out']} in {stats['busy'] * 1000:.0f} ms"
+            for name, stats in self.stats.items()
+        )
+
+
+class RequestPoolExhausted(Exception):
+    """Raised when every identity is backing off or has its circuit open"""
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RequestIdentity:
+    """One session + user agent + optional proxy, with its own cookie jar and health per endpoint"""
+    def __init__(self, user_agent, proxy, base_headers):
+        self.user_agent = user_agent
+        self.proxy = proxy
+        self.base_headers = base_headers
+        self._session = None
+        
+        # endpoint (host) -> {'failures', 'blocked_until', 'circuit_open_until'}
+        self.health = {}
+        self.last_used = 0.0
+
+    @property
+    def session(self):
+        """Created on first use so building the pool doesn't import requests"""
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers.update(self.base_headers)
+            self._session.headers['User-Agent'] = self.user_agent
+            if self.proxy:
+                self._session.proxies = {'http': self.proxy, 'https': self.proxy}
+        return self._session
+
+    def endpoint_health(self, endpoint):
+        if endpoint not in self.health:
+            self.health[endpoint] = {'failures': 0, 'blocked_until': 0.0, 'circuit_open_until': 0.0}
+        return self.health[endpoint]
+
+    def available_at(self, endpoint):
+        """Time from which this identity may be used for the endpoint again"""
+        health = self.endpoint_health(endpoint)
+        return max(health['blocked_until'], health['circuit_open_until'])
+
+    def describe(self):
+        return f"{self.user_agent[:40]}... via {self.proxy or 'direct'}"
+
+
+class RequestPool:
+    """Rotates sessions, user agents and proxies and routes requests around blocked identities"""
+    # Status codes that mean OLX is throttling or blocking this identity
+    BLOCK_STATUSES = (403, 429)
+
+    def __init__(self, user_agents, base_headers, proxies=None, settings=None):
+        settings = settings or {}
+        self.backoff_base = settings.get('backoff_base', 5)  # seconds
+        self.backoff_max = settings.get('backoff_max', 300)  # seconds
+        self.circuit_threshold = settings.get('circuit_threshold', 3)  # consecutive failures
+        self.circuit_cooldown = settings.get('circuit_cooldown', 600)  # seconds
+        self.max_attempts = settings.get('max_attempts', 3)
+        # Connection errors say nothing about an identity (direct ones share an IP), so they
+        # only get a short retry instead of backoff and circuit breaking
+        self.transport_retry_base = settings.get('transport_retry_base', 1)  # seconds
+        self.transport_retry_max = settings.get('transport_retry_max', 8)  # seconds
+        
+        # Watchlist checks share the pool from several threads
+        self.lock = threading.Lock()
+        
+        self.identities = []
+        for proxy in (proxies or [None]):
+            for user_agent in user_agents:
+                self.identities.append(RequestIdentity(user_agent, proxy, base_headers))
+        
+        print(f"Request pool ready with {len(self.identities)} identities")
+
+    def pick_identity(self, endpoint, exclude=()):
+        """Least recently used healthy identity, or None if all are backing off"""
+        now = time.time()
+        candidates = [
+            identity for identity in self.identities
+            if identity not in exclude and identity.available_at(endpoint) <= now
+        ]
+        if not candidates:
+            return None
+        
+        # Prefer identities with the fewest recent failures, then spread the load
+        return min(candidates, key=lambda i: (i.endpoint_health(endpoint)['failures'], i.last_used))
+
+    def seconds_until_available(self, endpoint='www.olx.pl'):
+        """How long until at least one identity can be used for the endpoint"""
+        soonest = min(identity.available_at(endpoint) for identity in self.identities)
+        return max(0.0, soonest - time.time())
+
+    def record_success(self, identity, endpoint):
+        health = identity.endpoint_health(endpoint)
+        health['failures'] = 0
+        health['blocked_until'] = 0.0
+        health['circuit_open_until'] = 0.0
+
+    def record_failure(self, identity, endpoint, retry_after=None):
+        """Exponential backoff per identity and endpoint, opening the circuit after repeated failures"""
+        health = identity.endpoint_health(endpoint)
+        health['failures'] += 1
+        now = time.time()
+        
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (health['failures'] - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        # Jitter so identities don't all come back at the same moment
+        health['blocked_until'] = now + delay * random.uniform(0.8, 1.2)
+        
+        if health['failures'] >= self.circuit_threshold:
+            health['circuit_open_until'] = now + self.circuit_cooldown
+            print(f"Circuit opened for {identity.describe()} on {endpoint} for {self.circuit_cooldown}s")
+        else:
+            print(f"Backing off {identity.describe()} on {endpoint} for {delay:.0f}s")
+
+    def get(self, url, **kwargs):
+        """GET through the healthiest identity, retrying on other identities when blocked"""
+        endpoint = urllib.parse.urlparse(url).netloc
+        tried = []
+        last_error = None
+        transport_failures = 0
+        
+        for attempt in range(self.max_attempts):
+            with self.lock:
+                identity = self.pick_identity(endpoint, exclude=tried)
+                if identity is None:
+                    break
+                identity.last_used = time.time()
+            
+            try:
+                response = identity.session.get(url, **kwargs)
+            except requests.RequestException as e:
+                last_error = e
+                transport_failures += 1
+                if attempt + 1 < self.max_attempts:
+                    delay = min(self.transport_retry_max, self.transport_retry_base * (2 ** (transport_failures - 1)))
+                    if DEBUG:
+                        print(f"[DEBUG] {type(e).__name__} for {endpoint}, retrying in {delay:.0f}s")
+                    time.sleep(delay)
+                continue
+            tried.append(identity)
+            
+            if response.status_code in self.BLOCK_STATUSES:
+                retry_after = response.headers.get('Retry-After')
+                retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+                # Hand the (possibly streamed) connection back before retrying; the error keeps no reference to it
+                response.close()
+                last_error = requests.HTTPError(f"{response.status_code} from {endpoint}")
+                with self.lock:
+                    self.record_failure(identity, endpoint, retry_after)
+                continue
+            
+            with self.lock:
+                self.record_success(identity, endpoint)
+            return response
+        
+        if last_error is not None and (transport_failures or len(tried) == self.max_attempts):
+            raise last_error
+        wait = self.seconds_until_available(endpoint)
+        raise RequestPoolExhausted(f"All identities backing off for {endpoint} ({wait:.0f}s)", wait)
+
+
+class ListingWatchlist:
+    """Listing pages we care about (e.g. sellers we've messaged), re-checked concurrently in the background.
+
+    Each listing has its own check interval that grows while nothing changes and resets on a change.
+    Checks go through a request pool of their own at max_per_second, so a burst of them can never
+    back off or circuit-break the search polls."""
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.items = {}  # url -> per-listing state, see new_item()
+        self.lock = threading.Lock()  # guards items between the sweep thread and state snapshots
+        self.file_signature = None
+        self.executor = None
+        self.executor_workers = None
+        self.request_pool = None
+        self.request_pool_source = None  # the scraper's pool ours was built alongside
+        self.rate_lock = threading.Lock()
+        self.next_request_at = 0.0
+        self.events = queue.Queue()  # found by the sweep thread, handled on the main thread
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def new_item(self):
+        min_interval = self.scraper.watchlist_settings['min_interval']
+        return {
+            'etag': None,
+            'last_modified': None,
+            'title': None,
+            'price': None,
+            'active': True,
+            'reserved': False,
+            'interval': min_interval,
+            # Spread first checks over one interval instead of fetching a new watchlist all at once
+            'next_check': time.time() + random.uniform(0, min_interval)
+        }
+
+    def load_urls(self):
+        """Sync watched URLs with the watchlist file whenever it changes"""
+        path = self.scraper.watchlist_settings['path']
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        if signature == self.file_signature:
+            return
+        self.file_signature = signature
+        
+        urls = []
+        if signature is not None:
+            with open(path, 'r', encoding='utf-8') as f:
+                urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        
+        with self.lock:
+            for url in urls:
+                if url not in self.items:
+                    self.items[url] = self.new_item()
+            for url in list(self.items):
+                if url not in urls:
+                    del self.items[url]
+        
+        print(f"👀 Watchlist: tracking {len(self.items)} listings")
+
+    def start(self):
+        """Start the background sweep thread once"""
+        if self.thread is None:
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self.run, name='watchlist-sweep', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while not self.stopping.wait(1.0):
+            try:
+                self.check_due()
+            except Exception as e:
+                print(f"Watchlist error: {e}")
+
+    def take_events(self):
+        """Changes found since the last call"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def get_request_pool(self):
+        """Request pool with the scraper's settings but its own identity health, rebuilt with the scraper's"""
+        if self.request_pool is None or self.request_pool_source is not self.scraper.request_pool:
+            self.request_pool_source = self.scraper.request_pool
+            settings = self.scraper.request_pool_settings or {}
+            self.request_pool = RequestPool(self.scraper.user_agents, self.scraper.headers,
+                                            proxies=settings.get('proxies'), settings=settings)
+        return self.request_pool
+
+    def wait_for_turn(self):
+        """Space checks max_per_second apart across all worker threads"""
+        with self.rate_lock:
+            now = time.monotonic()
+            turn = max(now, self.next_request_at)
+            self.next_request_at = turn + 1.0 / self.scraper.watchlist_settings['max_per_second']
+        self.stopping.wait(turn - now)
+
+    def check_due(self):
+        """Re-check every listing whose interval has elapsed, concurrently, and queue the resulting events"""
+        self.load_urls()
+        now = time.time()
+        with self.lock:
+            due = [url for url, item in self.items.items() if item['active'] and item['next_check'] <= now]
+        if not due:
+            return []
+        
+        workers = max(1, int(self.scraper.watchlist_settings['workers']))
+        if self.executor is None or self.executor_workers != workers:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='watchlist')
+            self.executor_workers = workers
+        
+        started = time.time()
+        events = [event for found in self.executor.map(self.check_listing, due) for event in found]
+        print(f"👀 Watchlist: checked {len(due)} listings in {time.time() - started:.1f}s, {len(events)} changes")
+        
+        for event in events:
+            self.events.put(event)
+        return events
+
+    def check_listing(self, url):
+        """Conditional check of one listing page; returns change events. Runs in a worker thread."""
+        with self.lock:
+            current = self.items.get(url)
+        if current is None or self.stopping.is_set():
+            return []
+        # Work on a copy and swap it in at the end, so state() never sees a half-updated entry
+        item = dict(current)
+        
+        headers = {}
+        if item['etag']:
+            headers['If-None-Match'] = item['etag']
+        if item['last_modified']:
+            headers['If-Modified-Since'] = item['last_modified']
+        
+        self.wait_for_turn()
+        details = self.scraper.check_direct_listing(url, headers=headers, request_pool=self.get_request_pool())
+        events = []
+        if details is None or not details['modified']:
+            self.schedule(item, changed=False)
+            self.replace_item(url, current, item)
+            return events
+        if not details['exists']:
+            details = {'active': False, 'reserved': item['reserved'], 'price': item['price'], 'title': item['title']}
+        else:
+            item['etag'] = details['etag']
+            item['last_modified'] = details['last_modified']
+        
+        # The first successful check is only a baseline
+        baseline = item['title'] is None
+        event = {'url': url, 'title': details['title'] or item['title'], 'price': details['price'], 'old_price': item['price']}
+        if not baseline:
+            if not details['active']:
+                events.append({**event, 'type': 'deactivated'})
+            if details['price'] is not None and item['price'] is not None and details['price'] != item['price']:
+                events.append({**event, 'type': 'price_changed'})
+            if details['reserved'] != item['reserved']:
+                events.append({**event, 'type': 'reserved' if details['reserved'] else 'unreserved'})
+        
+        item['title'] = details['title'] or item['title']
+        item['price'] = details['price'] if details['price'] is not None else item['price']
+        item['active'] = details['active']
+        item['reserved'] = details['reserved']
+        self.schedule(item, changed=bool(events))
+        self.replace_item(url, current, item)
+        return events
+
+    def replace_item(self, url, current, item):
+        """Swap in a checked entry, unless the listing was dropped or restored while it was being checked"""
+        with self.lock:
+            if self.items.get(url) is current:
+                self.items[url] = item
+
+    def schedule(self, item, changed):
+        """Back off listings that don't change, check changed ones again soon"""
+        settings = self.scraper.watchlist_settings
+        if changed:
+            item['interval'] = settings['min_interval']
+        else:
+            item['interval'] = min(settings['max_interval'], item['interval'] * settings['backoff_factor'])
+        item['next_check'] = time.time() + item['interval'] * random.uniform(0.9, 1.1)
+
+    def state(self):
+        with self.lock:
+            return {url: dict(item) for url, item in self.items.items()}
+
+    def restore(self, state):
+        with self.lock:
+            self.items.update(state)
+
+    def shutdown(self):
+        self.stopping.set()
+        self.thread = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+class CycleProfiler:
+    """--profile mode: samples the main and pipeline threads' stacks and tracks allocations for selected cycles.
+
+    Writes flame-graph folded stacks (flamegraph.pl / speedscope) and a per-cycle text report with
+    wall time and top allocations per run() stage, plus memory growth since the previous profiled
+    cycle and since the first one."""
+    IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>', '<unknown>')
+
+    def __init__(self, output_dir='profiles', every=1, interval=0.005, top=15):
+        self.output_dir = output_dir
+        self.every = max(1, every)
+        self.interval = interval
+        self.top = top
+        self.thread_id = threading.main_thread().ident
+        self.cycle = None  # cycle being profiled, None between cycles and on skipped ones
+        self.stage_name = 'cycle'
+        self.stage_reports = []
+        self.samples = {}
+        self.all_samples = {}
+        self.sampler = None
+        self.stop_sampling = threading.Event()
+        self.cycle_started = None
+        self.overhead = 0.0  # seconds spent taking and comparing snapshots this cycle
+        self.first_snapshot = None
+        self.previous_snapshot = None
+        
+        os.makedirs(output_dir, exist_ok=True)
+        # Tracing stays on between profiled cycles so growth across them is visible
+        tracemalloc.start()
+
+    def compare(self, snapshot, baseline):
+        """Per-line allocation differences, without tracemalloc's and the import system's own bookkeeping"""
+        # Filtering the grouped stats rather than the snapshots - Snapshot.filter_traces()
+        # walks every trace in Python and took seconds per call on a long-running heap
+        return [
+            stat for stat in snapshot.compare_to(baseline, 'lineno')
+            if stat.traceback[0].filename not in self.IGNORED_FILES
+        ]
+
+    def sample(self):
+        """Sampler thread: count the current stacks of the main thread, prefixed with the stage,
+        and of the search pipeline threads, prefixed with the thread name"""
+        while not self.stop_sampling.wait(self.interval):
+            pipeline_threads = {thread.ident: thread.name for thread in threading.enumerate() if thread.name.startswith('pipeline-')}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.thread_id:
+                    label = self.stage_name
+                elif thread_id in pipeline_threads:
+                    label = pipeline_threads[thread_id]
+                else:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(label)
+                folded = ';'.join(reversed(stack))
+                self.samples[folded] = self.samples.get(folded, 0) + 1
+
+    def start_cycle(self, cycle):
+        """Begin profiling this cycle if it's one of the selected ones"""
+        if (cycle - 1) % self.every:
+            return
+        self.cycle = cycle
+        self.stage_name = 'cycle'
+        self.stage_reports = []
+        self.samples = {}
+        self.overhead = 0.0
+        self.stop_sampling.clear()
+        self.sampler = threading.Thread(target=self.sample, name='profiler', daemon=True)
+        self.sampler.start()
+        self.cycle_started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a run() stage and record what it allocated"""
+        if self.cycle is None:
+            yield
+            return
+        
+        outer = self.stage_name
+        self.stage_name = 'profiler'  # so the snapshot cost is visible, not charged to the stage
+        overhead_started = time.perf_counter()
+        before = tracemalloc.take_snapshot()
+        started = time.perf_counter()
+        self.overhead += started - overhead_started
+        self.stage_name = name
+        try:
+            yield
+        finally:
+            finished = time.perf_counter()
+            self.stage_name = 'profiler'
+            stats = self.compare(tracemalloc.take_snapshot(), before)
+            self.stage_reports.append((name, finished - started, [stat for stat in stats if stat.size_diff > 0][:self.top]))
+            self.stage_name = outer
+            self.overhead += time.perf_counter() - finished
+
+    def end_cycle(self):
+        """Stop sampling and write this cycle's folded stacks and report"""
+        if self.cycle is None:
+            return
+        
+        elapsed = time.perf_counter() - self.cycle_started
+        self.stop_sampling.set()
+        self.sampler.join()
+        
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        
+        for stack, count in self.samples.items():
+            self.all_samples[stack] = self.all_samples.get(stack, 0) + count
+        name = f"cycle-{self.cycle:04d}"
+        self.write_folded(os.path.join(self.output_dir, f"{name}.folded"), self.samples)
+        self.write_folded(os.path.join(self.output_dir, 'all.folded'), self.all_samples)
+        
+        lines = [
+            f"Cycle #{self.cycle} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"Wall time: {elapsed * 1000:.1f} ms ({self.overhead * 1000:.1f} ms of it profiler overhead), "
+            f"{sum(self.samples.values())} stack samples every {self.interval * 1000:g} ms",
+            f"Traced memory: {current / 1024:.1f} KB (peak {peak / 1024:.1f} KB)",
+        ]
+        for stage, stage_elapsed, stats in self.stage_reports:
+            lines.append(f"\n== Stage {stage}: {stage_elapsed * 1000:.1f} ms, top allocations ==")
+            lines.extend(f"  {stat}" for stat in stats)
+        
+        growth = None
+        if self.previous_snapshot is not None:
+            stats = self.compare(snapshot, self.previous_snapshot)
+            growth = sum(stat.size_diff for stat in stats)
+            lines.append(f"\n== Growth since previous profiled cycle: {growth / 1024:+.1f} KB ==")
+            lines.extend(f"  {stat}" for stat in stats[:self.top])
+        if self.first_snapshot is not None and self.first_snapshot is not self.previous_snapshot:
+            stats = self.compare(snapshot, self.first_snapshot)
+            lines.append(f"\n== Growth since first profiled cycle: {sum(stat.size_diff for stat in stats) / 1024:+.1f} KB ==")
+            lines.extend(f"  {stat}" for stat in stats[:self.top])
+        
+        with open(os.path.join(self.output_dir, f"{name}.txt"), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        
+        if self.first_snapshot is None:
+            self.first_snapshot = snapshot
+        self.previous_snapshot = snapshot
+        self.cycle = None
+        
+        summary = (f"🔬 Profile written to {self.output_dir}/{name}.txt - {(elapsed - self.overhead) * 1000:.0f} ms "
+                   f"excluding profiler overhead, traced {current / 1024:.0f} KB")
+        if growth is not None:
+            summary += f" ({growth / 1024:+.1f} KB since last profile)"
+        print(summary)
+
+    def write_folded(self, path, samples):
+        """One 'frame;frame;frame count' line per distinct stack"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(samples.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def ring_hash(key):
+    """Stable 64-bit hash for the ring - the built-in hash() differs between processes"""
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent hash ring: a profile belongs to the first worker point after its hash.
+
+    Each worker gets many points, so when one joins or leaves only its share of the profiles moves."""
+    def __init__(self, workers, replicas=64):
+        self.points = sorted((ring_hash(f"{worker}#{replica}"), worker) for worker in workers for replica in range(replicas))
+        self.hashes = [point for point, _ in self.points]
+
+    def owner(self, key):
+        if not self.points:
+            return None
+        index = bisect.bisect(self.hashes, ring_hash(key)) % len(self.points)
+        return self.points[index][1]
+
+
+DEFAULT_SUBSCRIBER = 'default'
+
+
+def delivery_key(link, subscriber):
+    """Dedup key for one listing sent to one subscriber - the bare link for the single-chat setup"""
+    return link if subscriber == DEFAULT_SUBSCRIBER else f"{subscriber} {link}"
+
+
+class SubscriberIndex:
+    """Inverted index from phone model to subscriber price limits, sorted ascending.
+
+    A listing is matched with one bisect into its model's limits, so the cost grows with the
+    number of subscribers it matches rather than the number configured."""
+    def __init__(self, subscribers):
+        self.subscribers = {subscriber['name']: subscriber for subscriber in subscribers}
+        thresholds = {}
+        for subscriber in subscribers:
+            for model, limit in subscriber['price_limits'].items():
+                thresholds.setdefault(model, []).append((limit, subscriber['name']))
+        self.limits = {}
+        self.names = {}
+        for model, entries in thresholds.items():
+            entries.sort()
+            self.limits[model] = [limit for limit, _ in entries]
+            self.names[model] = [name for _, name in entries]
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    def match(self, model, price, profile=None):
+        """Subscribers whose limit for this model is at or above the price"""
+        limits = self.limits.get(model)
+        if limits is None or price is None:
+            return []
+        names = self.names[model][bisect.bisect_left(limits, price):]
+        matched = [self.subscribers[name] for name in names]
+        # Profile restrictions only need checking on the few that matched on price
+        return [subscriber for subscriber in matched
+                if profile is None or not subscriber.get('profiles') or profile in subscriber['profiles']]
+
+
+class TokenBucket:
+    """Allows rate sends a second on average, with bursts of up to capacity. Used on one event loop only."""
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def pause(self, seconds):
+        """Nothing goes out for a while, e.g. after Telegram asked us to back off"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def delay(self):
+        """Seconds until a token is free - takes it and returns 0 if one is free now"""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while (delay := self.delay()) > 0:
+            await asyncio.sleep(delay)
+
+
+class TelegramSender:
+    """Event loop on a background thread that every Telegram send goes through.
+
+    Telegram allows about 30 messages a second per bot and about one a second per chat (with short
+    bursts), so sends wait for a token from the bot's bucket and from their chat's, at most
+    concurrency of them at a time. Sends can be submitted without waiting; their results are
+    collected on the main thread with take_results()."""
+    CHAT_BURST = 3
 
-class OLXiPhoneScraper:
     def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.per_second = 30
+        self.per_chat_per_second = 1
+        self.concurrency = 10
+        self.bot_bucket = None
+        self.chat_buckets = {}
+        self.slots = None
+        self.results = queue.Queue()
+        self.outstanding = 0  # submitted but not yet taken
+        self.lock = threading.Lock()
+
+    def configure(self, per_second, per_chat_per_second, concurrency):
+        """New limits, applied from the next send on"""
+        if (per_second, per_chat_per_second, concurrency) != (self.per_second, self.per_chat_per_second, self.concurrency):
+            self.per_second = per_second
+            self.per_chat_per_second = per_chat_per_second
+            self.concurrency = concurrency
+            # The sender loop rebuilds the slots and buckets on its next send
+            self.slots = None
+
+    def start(self):
+        if self.thread is None:
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self.loop.run_forever, name='telegram-sender', daemon=True)
+            self.thread.start()
+
+    def run(self, coroutine):
+        """Run a coroutine on the sender loop and wait for its result"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def submit(self, coroutine, context):
+        """Run a coroutine on the sender loop without waiting; take_results() returns (context, result)"""
+        self.start()
+        with self.lock:
+            self.outstanding += 1
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        future.add_done_callback(lambda future: self.results.put((context, future)))
+
+    def take_results(self, timeout=0):
+        """Every finished submission, after waiting up to timeout seconds for the first one"""
+        taken = []
+        while True:
+            with self.lock:
+                if not self.outstanding:
+                    return taken
+            try:
+                if timeout and not taken:
+                    context, future = self.results.get(timeout=timeout)
+                else:
+                    context, future = self.results.get_nowait()
+            except queue.Empty:
+                return taken
+            with self.lock:
+                self.outstanding -= 1
+            try:
+                taken.append((context, future.result()))
+            except Exception as e:
+                print(f"Telegram delivery error: {e}")
+                taken.append((context, None))
+
+    @contextlib.asynccontextmanager
+    async def turn(self, chat_id):
+        """A free slot, then the chat's token, then the bot's - only slot holders wait on the buckets"""
+        slots, bot_bucket = self.slots, self.bot_bucket
+        if slots is None:
+            slots = self.slots = asyncio.Semaphore(self.concurrency)
+            bot_bucket = self.bot_bucket = TokenBucket(self.per_second)
+            self.chat_buckets = {}
+        async with slots:
+            chat_bucket = self.chat_buckets.get(chat_id)
+            if chat_bucket is None:
+                chat_bucket = self.chat_buckets[chat_id] = TokenBucket(self.per_chat_per_second, self.CHAT_BURST)
+            await chat_bucket.acquire()
+            await bot_bucket.acquire()
+            yield
+
+    def back_off(self, seconds):
+        """Telegram answered 429 - hold every send, not just the one that hit it"""
+        if self.bot_bucket is not None:
+            self.bot_bucket.pause(seconds)
+
+    def stop(self, timeout=5):
+        if self.thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+
+class SharedStore:
+    """State shared by sharded workers and the coordinator, in one SQLite file on a volume they all reach.
+
+    Holds worker heartbeats, profile assignments, watermarks and the notification outbox, which
+    doubles as the cross-worker dedup: a worker only sends a listing after its outbox row went in.
+    Outbox rows are keyed by delivery_key(), i.e. per listing and subscriber."""
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, beats INTEGER NOT NULL, host TEXT, pid INTEGER)",
+        "CREATE TABLE IF NOT EXISTS assignments (profile TEXT PRIMARY KEY, worker_id TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS watermarks (search_url TEXT PRIMARY KEY, links TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS outbox (link TEXT PRIMARY KEY, payload TEXT NOT NULL, worker_id TEXT, claimed_at REAL NOT NULL, sent_at REAL)",
+    )
+
+    def __init__(self, path, journal_mode='delete', timeout=30):
+        # Autocommit - multi-statement changes use explicit BEGIN IMMEDIATE
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.connection.execute(f"PRAGMA journal_mode={journal_mode}")
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def heartbeat(self, worker_id):
+        """Join the cluster or show we're still alive - the coordinator watches the counter, not clocks"""
+        self.connection.execute(
+            "INSERT INTO workers (worker_id, beats, host, pid) VALUES (?, 1, ?, ?) "
+            "ON CONFLICT(worker_id) DO UPDATE SET beats = beats + 1, host = excluded.host, pid = excluded.pid",
+            (worker_id, platform.node(), os.getpid())
+        )
+
+    def worker_beats(self):
+        return dict(self.connection.execute("SELECT worker_id, beats FROM workers"))
+
+    def worker_process(self, worker_id):
+        """(host, pid) of the last process that beat under this ID, or None"""
+        return self.connection.execute("SELECT host, pid FROM workers WHERE worker_id = ?", (worker_id,)).fetchone()
+
+    def remove_worker(self, worker_id):
+        """Drop a worker and hand its unsent notifications to whoever adopts them next"""
+        with self.transaction() as db:
+            db.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+            db.execute("UPDATE outbox SET worker_id = NULL WHERE worker_id = ? AND sent_at IS NULL", (worker_id,))
+
+    def set_assignments(self, assignments):
+        with self.transaction() as db:
+            db.execute("DELETE FROM assignments")
+            db.executemany("INSERT INTO assignments (profile, worker_id) VALUES (?, ?)", assignments.items())
+
+    def assigned_profiles(self, worker_id):
+        return {profile for profile, in self.connection.execute("SELECT profile FROM assignments WHERE worker_id = ?", (worker_id,))}
+
+    def watermark(self, search_url):
+        row = self.connection.execute("SELECT links FROM watermarks WHERE search_url = ?", (search_url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_watermark(self, search_url, links):
+        self.connection.execute("INSERT OR REPLACE INTO watermarks (search_url, links) VALUES (?, ?)", (search_url, json.dumps(links)))
+
+    def notified_keys(self, keys):
+        """Which of these delivery keys any worker has already claimed or sent"""
+        keys = list(keys)
+        found = set()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            found.update(key for key, in self.connection.execute(
+                f"SELECT link FROM outbox WHERE link IN ({', '.join('?' * len(batch))})", batch))
+        return found
+
+    def claim_notifications(self, payloads, worker_id):
+        """Reserve deliveries for this worker to send; returns the keys no other worker got to first"""
+        claimed = set()
+        claimed_at = time.time()
+        with self.transaction() as db:
+            for key, payload in payloads.items():
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO outbox (link, payload, worker_id, claimed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(payload, ensure_ascii=False), worker_id, claimed_at)
+                )
+                if cursor.rowcount == 1:
+                    claimed.add(key)
+        return claimed
+
+    def mark_sent(self, keys):
+        sent_at = time.time()
+        self.connection.executemany("UPDATE outbox SET sent_at = ? WHERE link = ?", [(sent_at, key) for key in keys])
+
+    def release(self, keys):
+        """Give up claims after a failed send so those deliveries are retried"""
+        self.connection.executemany("DELETE FROM outbox WHERE link = ? AND sent_at IS NULL", [(key,) for key in keys])
+
+    def prune_sent(self, before):
+        """Drop delivered outbox rows sent before the given time; returns how many went"""
+        return self.connection.execute("DELETE FROM outbox WHERE sent_at < ?", (before,)).rowcount
+
+    def adopt_orphans(self, worker_id):
+        """Take over unsent notifications of departed workers (and our own from before a crash)"""
+        with self.transaction() as db:
+            rows = db.execute(
+                "SELECT link, payload FROM outbox WHERE sent_at IS NULL AND (worker_id IS NULL OR worker_id = ?)",
+                (worker_id,)
+            ).fetchall()
+            db.executemany("UPDATE outbox SET worker_id = ? WHERE link = ?", [(worker_id, key) for key, _ in rows])
+        return [(key, json.loads(payload)) for key, payload in rows]
+
+    def close(self):
+        self.connection.close()
+
+
+class WorkerHeartbeat:
+    """Heartbeats for a sharded worker from a background thread, so a long backoff sleep or a slow
+    cycle isn't mistaken for a dead worker. Beats a few times per heartbeat_ttl on its own
+    connection - sqlite3 connections stay on the thread that opened them."""
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='worker-heartbeat', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        settings = self.scraper.cluster_settings
+        store = SharedStore(settings['store'], journal_mode=settings['journal_mode'])
+        try:
+            while True:
+                try:
+                    store.heartbeat(self.scraper.worker_id)
+                except sqlite3.Error as e:
+                    print(f"Heartbeat failed: {e}")
+                if self.stopping.wait(self.scraper.cluster_settings['heartbeat_ttl'] / 3):
+                    break
+        finally:
+            store.close()
+
+    def stop(self):
+        """Stop beating - before the worker removes itself, or the next beat would re-add it"""
+        self.stopping.set()
+        self.thread.join(timeout=5)
+
+
+class ShardCoordinator:
+    """--coordinator mode: tracks live workers and spreads the search profiles across them.
+
+    A worker counts as dead when its heartbeat counter hasn't moved for heartbeat_ttl seconds of the
+    coordinator's own clock. Workers keep their last assignment if the coordinator is down."""
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.store = scraper.open_store()
+        self.beats = {}
+        self.last_seen = {}
+        self.assignments = None
+
+    def step(self):
+        now = time.monotonic()
+        beats = self.store.worker_beats()
+        for worker_id, count in beats.items():
+            if self.beats.get(worker_id) != count:
+                self.beats[worker_id] = count
+                self.last_seen[worker_id] = now
+        
+        ttl = self.scraper.cluster_settings['heartbeat_ttl']
+        for worker_id in list(self.beats):
+            if worker_id not in beats:
+                print(f"👋 Worker {worker_id} left")
+            elif now - self.last_seen[worker_id] > ttl:
+                print(f"💀 Worker {worker_id} missed heartbeats for {ttl}s - removing it")
+                self.store.remove_worker(worker_id)
+            else:
+                continue
+            del self.beats[worker_id], self.last_seen[worker_id]
+        
+        ring = HashRing(sorted(self.beats))
+        assignments = {profile['name']: ring.owner(profile['name']) for profile in self.scraper.profiles()} if self.beats else {}
+        if assignments != self.assignments:
+            self.store.set_assignments(assignments)
+            self.assignments = assignments
+            if not self.beats:
+                print("No live workers - waiting for one to join")
+                return
+            print(f"\n⚖️ Rebalanced {len(assignments)} profiles across {len(self.beats)} workers - {datetime.now().strftime('%H:%M:%S')}")
+            for worker_id in sorted(self.beats):
+                owned = sorted(profile for profile, owner in assignments.items() if owner == worker_id)
+                print(f"  {worker_id}: {', '.join(owned) or '-'}")
+
+    def run(self):
+        """Coordinate until interrupted"""
+        print(f"🧭 Coordinating workers through {self.scraper.cluster_settings['store']}")
+        while True:
+            self.scraper.reload_config_if_changed()
+            self.step()
+            time.sleep(self.scraper.cluster_settings['coordinator_interval'])
+
+
+class ListingArchive:
+    """Every listing the monitor has seen, kept in SQLite for the query API.
+
+    WAL mode lets the API's read-only connections query while a cycle writes, without
+    either side waiting on the other."""
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS listings ("
+        " id TEXT PRIMARY KEY, link TEXT NOT NULL, title TEXT NOT NULL, model TEXT COLLATE NOCASE,"
+        " price REAL, location TEXT COLLATE NOCASE, profile TEXT, promoted INTEGER NOT NULL DEFAULT 0,"
+        " first_seen REAL NOT NULL, last_seen REAL NOT NULL, removed_at REAL)",
+        # Secondary indexes for the API filters - model queries are usually price ranges too
+        "CREATE INDEX IF NOT EXISTS listings_model_price ON listings (model, price)",
+        "CREATE INDEX IF NOT EXISTS listings_price ON listings (price)",
+        "CREATE INDEX IF NOT EXISTS listings_location ON listings (location)",
+        "CREATE INDEX IF NOT EXISTS listings_first_seen ON listings (first_seen)",
+        "CREATE INDEX IF NOT EXISTS listings_last_seen ON listings (last_seen)",
+        "CREATE INDEX IF NOT EXISTS listings_removed_at ON listings (removed_at)",
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # Losing the last cycle on a power cut is fine - it's re-read next cycle
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+
+    def record(self, profile, offers, events, seen_at):
+        """Upsert this cycle's offers of one search and mark removed ones, in one transaction"""
+        rows = [
+            (listing_id, offer.link, offer.title, offer.phone_model, offer.price, offer.location or None, profile,
+             int(offer.promoted), seen_at, seen_at)
+            for listing_id, offer in offers
+        ]
+        removed = [(seen_at, event['id']) for event in events if event['type'] == 'removed']
+        
+        self.connection.execute("BEGIN")
+        try:
+            self.connection.executemany(
+                "INSERT INTO listings (id, link, title, model, price, location, profile, promoted, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET title = excluded.title, model = excluded.model, price = excluded.price, "
+                "location = coalesce(excluded.location, location), promoted = excluded.promoted, "
+                "last_seen = excluded.last_seen, removed_at = NULL",
+                rows
+            )
+            self.connection.executemany("UPDATE listings SET removed_at = ? WHERE id = ?", removed)
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def close(self):
+        self.connection.close()
+
+
+class QueryError(ValueError):
+    """Bad query parameter, answered with 400"""
+
+
+class ListingQueryAPI:
+    """Small read-only HTTP/JSON service over the listing archive, run in background threads.
+
+    GET /listings  - matching listings, paginated with limit/offset
+    GET /stats     - count and min/avg/max price, optionally grouped by model, location, profile or day
+    GET /health    - archive size
+
+    Filters for both: model, location (prefix, e.g. Warszawa), profile, min_price, max_price,
+    status (active/removed), since/until (ISO date or epoch seconds) applied to the time field
+    (first_seen, last_seen or removed_at; removed_at when status=removed)."""
+    TIME_FIELDS = ('first_seen', 'last_seen', 'removed_at')
+    SORT_FIELDS = ('price', 'first_seen', 'last_seen', 'removed_at', 'model', 'location')
+    GROUP_FIELDS = {
+        'model': 'model',
+        'location': 'location',
+        'profile': 'profile',
+        'day': "date(coalesce(removed_at, last_seen), 'unixepoch', 'localtime')",
+    }
+    MAX_LIMIT = 500
+
+    def __init__(self, archive_path, host, port, page_size=50):
+        self.archive_path = archive_path
+        self.page_size = page_size
+        self.server = http_server.ThreadingHTTPServer((host, port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='query-api', daemon=True)
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def connect(self):
+        """Read-only connection per request - it can never take a write lock on the archive"""
+        connection = sqlite3.connect(f"file:{urllib.parse.quote(os.path.abspath(self.archive_path))}?mode=ro", uri=True)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def parse_time(self, value):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            raise QueryError(f"not a date or epoch seconds: {value}")
+
+    def parse_number(self, name, value):
+        try:
+            return float(value)
+        except ValueError:
+            raise QueryError(f"{name} must be a number")
+
+    def where(self, params):
+        """WHERE clause and arguments for the shared filters"""
+        clauses = []
+        args = []
+        
+        if 'model' in params:
+            clauses.append("model = ?")
+            args.append(params['model'])
+        if 'location' in params:
+            # Prefix match so the NOCASE index on location can be used
+            clauses.append("location LIKE ? ESCAPE '\\'")
+            args.append(re.sub(r'([%_\\])', r'\\\1', params['location']) + '%')
+        if 'profile' in params:
+            clauses.append("profile = ?")
+            args.append(params['profile'])
+        if 'min_price' in params:
+            clauses.append("price >= ?")
+            args.append(self.parse_number('min_price', params['min_price']))
+        if 'max_price' in params:
+            clauses.append("price <= ?")
+            args.append(self.parse_number('max_price', params['max_price']))
+        
+        status = params.get('status')
+        if status == 'active':
+            clauses.append("removed_at IS NULL")
+        elif status == 'removed':
+            clauses.append("removed_at IS NOT NULL")
+        elif status is not None:
+            raise QueryError("status must be active or removed")
+        
+        time_field = params.get('time_field', 'removed_at' if status == 'removed' else 'last_seen')
+        if time_field not in self.TIME_FIELDS:
+            raise QueryError(f"time_field must be one of {', '.join(self.TIME_FIELDS)}")
+        if 'since' in params:
+            clauses.append(f"{time_field} >= ?")
+            args.append(self.parse_time(params['since']))
+        if 'until' in params:
+            clauses.append(f"{time_field} < ?")
+            args.append(self.parse_time(params['until']))
+        
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), args
+
+    def listing_record(self, row):
+        record = dict(row)
+        for field in self.TIME_FIELDS:
+            if record[field] is not None:
+                record[field] = datetime.fromtimestamp(record[field]).isoformat(timespec='seconds')
+        record['promoted'] = bool(record['promoted'])
+        return record
+
+    def query_listings(self, params):
+        where, args = self.where(params)
+        
+        sort = params.get('sort', '-last_seen')
+        field = sort.lstrip('-')
+        if field not in self.SORT_FIELDS:
+            raise QueryError(f"sort must be one of {', '.join(self.SORT_FIELDS)}, optionally prefixed with -")
+        order = f"{field} {'DESC' if sort.startswith('-') else 'ASC'}, id"
+        
+        try:
+            limit = min(int(params.get('limit', self.page_size)), self.MAX_LIMIT)
+            offset = int(params.get('offset', 0))
+        except ValueError:
+            raise QueryError("limit and offset must be integers")
+        if limit < 1 or offset < 0:
+            raise QueryError("limit must be positive and offset not negative")
+        
+        with contextlib.closing(self.connect()) as connection:
+            total = connection.execute(f"SELECT count(*) FROM listings{where}", args).fetchone()[0]
+            rows = connection.execute(f"SELECT * FROM listings{where} ORDER BY {order} LIMIT ? OFFSET ?", args + [limit, offset]).fetchall()
+        
+        result = {'total': total, 'offset': offset, 'items': [self.listing_record(row) for row in rows]}
+        if offset + limit < total:
+            result['next'] = '/listings?' + urllib.parse.urlencode({**params, 'offset': offset + limit})
+        return result
+
+    def query_stats(self, params):
+        where, args = self.where(params)
+        
+        group_by = params.get('group_by')
+        if group_by is not None and group_by not in self.GROUP_FIELDS:
+            raise QueryError(f"group_by must be one of {', '.join(self.GROUP_FIELDS)}")
+        group = self.GROUP_FIELDS.get(group_by)
+        
+        columns = "count(*) AS count, min(price) AS min_price, round(avg(price), 2) AS avg_price, max(price) AS max_price"
+        if group:
+            sql = f"SELECT {group} AS {group_by}, {columns} FROM listings{where} GROUP BY 1 ORDER BY 1"
+        else:
+            sql = f"SELECT {columns} FROM listings{where}"
+        
+        with contextlib.closing(self.connect()) as connection:
+            rows = [dict(row) for row in connection.execute(sql, args)]
+        return {'groups': rows} if group else rows[0]
+
+    def query_health(self, params):
+        with contextlib.closing(self.connect()) as connection:
+            total, active, newest = connection.execute(
+                "SELECT count(*), count(*) - count(removed_at), max(last_seen) FROM listings"
+            ).fetchone()
+        return {
+            'listings': total,
+            'active': active,
+            'last_seen': datetime.fromtimestamp(newest).isoformat(timespec='seconds') if newest else None
+        }
+
+    def make_handler(self):
+        api = self
+        routes = {'/listings': api.query_listings, '/stats': api.query_stats, '/health': api.query_health}
+        
+        class Handler(http_server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                route = routes.get(url.path.rstrip('/') or '/')
+                if route is None:
+                    return self.reply(404, {'error': f"unknown endpoint, try {', '.join(routes)}"})
+                
+                params = dict(urllib.parse.parse_qsl(url.query))
+                try:
+                    return self.reply(200, route(params))
+                except QueryError as e:
+                    return self.reply(400, {'error': str(e)})
+                except sqlite3.OperationalError as e:
+                    # e.g. the archive doesn't exist until the first cycle wrote it
+                    return self.reply(503, {'error': str(e)})
+            
+            def reply(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                # Dashboards poll often - keep the monitor output readable
+                pass
+        
+        return Handler
+
+
+class OLXiPhoneScraper:
+    # Settings that config.json may override and that are swapped in on reload
+    RELOADABLE_SETTINGS = ('search_filters', 'search_profiles', 'price_limits', 'subscribers', 'user_agents', 'logging_enabled', 'verbose', 'log_level',
+                           'parser_settings', 'fetch_settings', 'watchlist_settings')
+    PARSER_MODES = ('inline', 'process_pool')
+    FETCH_MODES = ('streaming', 'buffered')
+    LOG_LEVELS = ('info', 'debug')
+    JOURNAL_MODES = ('delete', 'truncate', 'wal')
+    # store and journal_mode are only read when the store is opened at start-up
+    CLUSTER_DEFAULTS = {
+        'store': 'cluster.sqlite',  # SQLite file on a volume shared by all workers
+        'journal_mode': 'delete',  # 'wal' is faster but needs every process on the same host
+        'heartbeat_ttl': 90,  # seconds without a heartbeat before a worker's profiles move
+        'coordinator_interval': 5  # seconds between coordinator membership checks
+    }
+    QUERY_API_DEFAULTS = {
+        'enabled': False,
+        'host': '127.0.0.1',
+        'port': 8765,
+        'archive': 'listings.sqlite',  # every listing seen, with price, model, location and seen/removed times
+        'page_size': 50
+    }
+    STATE_SNAPSHOT_VERSION = 4
+    WATERMARK_SIZE = 10
+
+    def __init__(self, worker_id=None):
         # Search filters configuration - easily editable
         self.search_filters = {
             'base_url': 'https://www.olx.pl/elektronika/telefony/warszawa/',
@@ -41,6 +1849,10 @@ class OLXiPhoneScraper:
             ]
         }
         
+        # Extra searches, e.g. one per city - each has a unique 'name' and overrides any
+        # search_filters keys. With none set, search_filters is the only search.
+        self.search_profiles = []
+        
         # Logging and debugging settings
         self.logging_enabled = False  # Set to True to enable logging to logs.txt
         
@@ -63,12 +1875,17 @@ class OLXiPhoneScraper:
             "iPhone 15 Pro": 2100,
             "iPhone 15 Pro Max": 2400
         }
+        # People sharing this monitor, each with their own chat and limits, e.g.
+        # {"name": "anna", "chat_id": "123", "price_limits": {"iPhone 13": 700}, "profiles": ["krakow"]}.
+        # With none set, deals go to telegram.chat_id using price_limits above.
+        self.subscribers = []
+        self.subscriber_index = None
         
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'pl-PL,pl;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': supported_accept_encoding(),
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         }
@@ -85,21 +1902,188 @@ class OLXiPhoneScraper:
         
         # Control output verbosity
         self.verbose = True  # Set to False for less debug output
+        self.log_level = 'info'  # 'debug' adds per-card and per-offer [DEBUG] traces
+        
+        # Parsing execution mode for buffered fetches - 'inline' parses in the fetch loop,
+        # 'process_pool' fetches every profile's page up front and hands the raw bytes to
+        # parser worker processes, which parse while later pages download and earlier ones notify
+        self.parser_settings = {
+            'mode': 'inline',
+            'workers': os.cpu_count() or 2
+        }
+        self.parser_pool = None
+        self.prefetched = {}  # search URL -> submitted page, for this cycle only
+        
+        # Fetch mode - 'streaming' parses cards as bytes arrive and stops reading once
+        # card_limit offers are parsed or watermark_overlap known non-promoted offers in a row
+        # show everything below is old; 'buffered' downloads the whole page first
+        self.fetch_settings = {
+            'mode': 'streaming',
+            'card_limit': 50,
+            'watermark_overlap': 3,
+            'full_scan_every': 5,  # every Nth poll of a search ignores the watermark and reads the whole page
+            'chunk_size': 16384,
+            'queue_size': 32,  # items buffered between pipeline stages before the faster one waits
+            # Threads per pipeline stage - extract always has one, it holds the page parser's state.
+            # Both stages are pure Python, so more only pay off on a free-threaded interpreter.
+            'classify_workers': 1,
+            'filter_workers': 1
+        }
+        
+        # Listing pages re-checked for price changes, reservation and deactivation
+        self.watchlist_settings = {
+            'path': 'watchlist.txt',  # one listing URL per line
+            'workers': 8,  # concurrent checks
+            'min_interval': 60,  # seconds, used again right after a change
+            'max_interval': 1800,  # seconds, reached by listings that stay unchanged
+            'backoff_factor': 1.5,
+            'max_per_second': 2  # checks per second across all workers, separate from search polling
+        }
+        
+        # Everything above is the default - config.json can override these settings
+        # and they're hot-reloaded between cycles when the file changes
+        self.default_settings = {name: copy.deepcopy(getattr(self, name)) for name in self.RELOADABLE_SETTINGS}
+        self.config_path = 'config.json'
+        self.config_signature = None
+        self.search_urls = {}  # built search URL per profile name
+        self.active_profile = None
+        self.request_pool = None
+        self.bot = None
+        self.bot_token = None
+        self.telegram_api_url = None
+        self.sender = TelegramSender()
+        self.sending = set()  # delivery keys handed to the sender, not yet recorded as sent or failed
+        
+        # Track listings that have been notified to prevent duplicate messages - delivery key -> sent at
+        self.notified_listings = {}
+        self.notified_listings_loaded = False
+        self.notified_pruned_at = 0.0
+        
+        # Newest links per search URL from the last poll
+        self.watermarks = {}
+        
+        # Last parsed result per search URL: {'taken_at', 'entries': {listing ID: (price, position, first_seen, link, title, promoted)}}
+        self.search_snapshots = {}
+        self.partial_scans = {}  # search URL -> polls since its last full-page read
+        self.history_path = 'listing_history.jsonl'
+        
+        self.watchlist = ListingWatchlist(self)
+        
+        # CycleProfiler when started with --profile
+        self.profiler = None
+        
+        # Sharded mode (--worker): this process only polls the profiles the coordinator assigned
+        # to it and shares dedup, watermark and outbox state with the other workers through the store
+        self.worker_id = worker_id
+        self.store = None
+        self.heartbeat = None
+        self.cluster_settings = dict(self.CLUSTER_DEFAULTS)
+        self.notified_listings_path = 'notified_listings.txt'
+        
+        # Listing archive and its HTTP/JSON query API, when query_api.enabled is set
+        self.query_api_settings = None
+        self.archive = None
+        self.query_api = None
+        
+        # Binary copy of the dedup/watermark state for fast start-up
+        self.state_snapshot_path = 'state.snapshot'
+        self.state_dirty = False
+        if worker_id:
+            # Several workers may share a working directory
+            self.state_snapshot_path = f'state-{worker_id}.snapshot'
+            self.notified_listings_path = f'notified_listings-{worker_id}.txt'
+        
+        # Start-up milestones, reported after the first cycle
+        self.startup_timings = []
+        self.mark_startup('imports')
         
         # Load configuration for Telegram
         self.load_config()
+        if worker_id:
+            self.open_store()
+        self.mark_startup('config + state')
+
+    def start_parser_pool(self):
+        """Start the parser worker processes once and keep them for all cycles"""
+        if self.parser_pool is not None:
+            return self.parser_pool
         
-        # Track listings that have been notified to prevent duplicate messages
-        self.notified_listings = set()
+        workers = max(1, int(self.parser_settings.get('workers') or 1))
+        # Never fork: the pool may be (re)started while the API, heartbeat and watchlist threads are running
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.parser_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method),
+                                               initializer=init_parser_worker, initargs=(DEBUG,))
         
-        # Load previously notified listings from file to persist across restarts
-        if hasattr(self, 'telegram_enabled') and self.telegram_enabled:
-            self.load_notified_listings()
+        # Spawn every worker up front so start-up isn't paid during a cycle
+        list(self.parser_pool.map(warm_up_parser_worker, range(workers)))
+        print(f"Parser pool started with {workers} worker processes")
+        return self.parser_pool
+
+    def shutdown_parser_pool(self):
+        """Stop the parser worker processes"""
+        if self.parser_pool is not None:
+            self.parser_pool.shutdown(wait=True, cancel_futures=True)
+            self.parser_pool = None
+
+    def submit_search_page(self, content):
+        """Hand a fetched page to the parser pool without waiting for it. Returns (content, future)."""
+        future = None
+        if self.parser_settings.get('mode') == 'process_pool':
+            try:
+                future = self.start_parser_pool().submit(parse_search_page, content)
+            except Exception as e:
+                print(f"Parser pool error, parsing inline: {e}")
+                self.shutdown_parser_pool()
+        return content, future
+
+    def parsed_search_page(self, page):
+        """Offers of a submitted page - waits for its worker, or parses inline"""
+        content, future = page
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                # A broken pool shouldn't stop monitoring - parse inline and rebuild next time
+                print(f"Parser pool error, parsing inline: {e}")
+                self.shutdown_parser_pool()
+        return parse_search_page(content)
+
+    def prefetch_search_pages(self, profiles):
+        """process_pool mode: fetch every profile's page and submit it, so all pages parse in parallel"""
+        self.prefetched = {}
+        for profile in profiles:
+            self.active_profile = profile
+            search_url = self.build_search_url()
+            try:
+                response = self.request_pool.get(search_url, timeout=15)
+                response.raise_for_status()
+            except Exception as e:
+                # poll_search fetches it again and reports the error there
+                if DEBUG:
+                    print(f"[DEBUG] Prefetch of {profile['name']} failed: {e}")
+                continue
+            self.prefetched[search_url] = self.submit_search_page(response.content)
+
+    def profiles(self):
+        """Configured search profiles, or a single 'default' one using search_filters as they are"""
+        return self.search_profiles or [{'name': 'default'}]
+
+    def profile_filters(self):
+        """search_filters with the active profile's overrides applied"""
+        if not self.active_profile:
+            return self.search_filters
+        return {**self.search_filters, **{key: value for key, value in self.active_profile.items() if key != 'name'}}
 
     def build_search_url(self):
         """Build the search URL dynamically based on filters"""
-        base_url = self.search_filters['base_url']
-        query = self.search_filters['query']
+        # Cached per profile until search_filters or search_profiles change on a config reload
+        profile_name = self.active_profile['name'] if self.active_profile else None
+        if profile_name in self.search_urls:
+            return self.search_urls[profile_name]
+        
+        search_filters = self.profile_filters()
+        base_url = search_filters['base_url']
+        query = search_filters['query']
         
         # Start building the URL
         url = f"{base_url}q-{query}/"
@@ -108,20 +2092,20 @@ class OLXiPhoneScraper:
         params = {}
         
         # Distance filter
-        if self.search_filters.get('distance'):
-            params['search[dist]'] = str(self.search_filters['distance'])
+        if search_filters.get('distance'):
+            params['search[dist]'] = str(search_filters['distance'])
         
         # Order filter
-        if self.search_filters.get('order'):
-            params['search[order]'] = self.search_filters['order']
+        if search_filters.get('order'):
+            params['search[order]'] = search_filters['order']
         
         # Condition filter (used/new)
-        if self.search_filters.get('condition'):
-            params['search[filter_enum_state][0]'] = self.search_filters['condition']
+        if search_filters.get('condition'):
+            params['search[filter_enum_state][0]'] = search_filters['condition']
         
         # Phone model filters
-        if self.search_filters.get('phone_models'):
-            for i, model in enumerate(self.search_filters['phone_models']):
+        if search_filters.get('phone_models'):
+            for i, model in enumerate(search_filters['phone_models']):
                 params[f'search[filter_enum_phonemodel][{i}]'] = model
         
         # Build the final URL with parameters
@@ -131,6 +2115,7 @@ class OLXiPhoneScraper:
         if self.verbose:
             print(f"Built search URL: {url}")
         
+        self.search_urls[profile_name] = url
         return url
 
     def extract_price(self, price_text):
@@ -179,7 +2164,7 @@ class OLXiPhoneScraper:
             if size_variant:
                 model += " Max" if size_variant == "max" else " Plus"
                 
-            if self.verbose:
+            if DEBUG:
                 print(f"URL pattern matched '{title}' to {model}")
             return model
         
@@ -215,11 +2200,11 @@ class OLXiPhoneScraper:
         # Try each pattern
         for pattern, model_name in model_patterns:
             if re.search(pattern, title_lower):
-                if self.verbose:
+                if DEBUG:
                     print(f"Matched '{title}' to {model_name}")
                 return model_name
         
-        if self.verbose:
+        if DEBUG:
             print(f"Could not identify model from title: {title}")
         return None
 
@@ -229,11 +2214,11 @@ class OLXiPhoneScraper:
             if self.verbose:
                 print(f"Fetching description from: {listing_url}")
             
-            response = requests.get(listing_url, headers=self.headers, timeout=10)
+            response = self.request_pool.get(listing_url, timeout=10)
             if response.status_code != 200:
                 return "No description available"
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = bs4.BeautifulSoup(response.content, 'html.parser')
             
             # Try different selectors for OLX description
             description_selectors = [
@@ -275,10 +2260,10 @@ class OLXiPhoneScraper:
         search_url = self.build_search_url()
         
         try:
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = self.request_pool.get(search_url, timeout=15)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = bs4.BeautifulSoup(response.content, 'html.parser')
             
             # Find listing containers with multiple selectors
             listing_selectors = [
@@ -386,13 +2371,10 @@ class OLXiPhoneScraper:
                     # Description fetching removed for speed optimization
                     description = "Description fetching disabled for speed"
                     
-                    listing_data = {
-                        'phone_name': phone_model,
-                        'price': price,
-                        'description': description,
-                        'link': link,
-                        'title': title
-                    }
+                    listing_data = Listing(title, price_text, link)
+                    listing_data.phone_model = phone_model
+                    listing_data.price = price
+                    listing_data.description = description
                     
                     # Add to seen listings
                     self.seen_listings.add(link)
@@ -405,9 +2387,9 @@ class OLXiPhoneScraper:
                         self.send_telegram_notification(listing_data)
                         # Log notification sent to logs.txt (simple line)
                         with open('logs.txt', 'a', encoding='utf-8') as logf:
-                            logf.write(f"[NOTIFICATION SENT] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | {listing_data['phone_name']} | {listing_data['price']} zł | {listing_data['link']}\n")
-                        self.notified_listings.add(link)
-                        self.save_notified_listings()
+                            logf.write(f"[NOTIFICATION SENT] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | {listing_data.phone_name} | {listing_data.price} zł | {listing_data.link}\n")
+                        self.notified_listings[link] = time.time()
+                        self.save_notified_listings([link])
                     
                     # Limit processing
                     if len(valid_listings) >= 20:
@@ -440,113 +2422,819 @@ class OLXiPhoneScraper:
                 print(traceback.format_exc())
             return []
 
+    def config_file_signature(self):
+        """mtime + size of config.json, or None if it doesn't exist"""
+        try:
+            stat = os.stat(self.config_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
     def load_config(self):
         """Load configuration from config.json"""
+        self.config_signature = self.config_file_signature()
         try:
-            with open('config.json', 'r') as f:
+            with open(self.config_path, 'r') as f:
                 config = json.load(f)
             
-            telegram_config = config.get('telegram', {})
-            self.bot_token = telegram_config.get('bot_token')
-            self.chat_id = telegram_config.get('chat_id')
-            self.telegram_enabled = telegram_config.get('enabled', False) and self.bot_token
+            errors = self.validate_config(config)
+            if errors:
+                raise ValueError('; '.join(errors))
             
+            self.apply_config(config)
+            
+        except FileNotFoundError:
+            print("config.json not found - Telegram notifications disabled")
+            self.apply_config({})
+        except Exception as e:
+            print(f"Error loading config: {e}")
+            self.apply_config({})
+
+    def reload_config_if_changed(self):
+        """Re-read config.json if it changed on disk; keeps the running config if the new one is invalid"""
+        signature = self.config_file_signature()
+        if signature == self.config_signature:
+            return False
+        self.config_signature = signature
+        
+        try:
+            with open(self.config_path, 'r') as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            print("config.json was removed - keeping current configuration")
+            return False
+        except Exception as e:
+            print(f"Config reload failed, keeping current configuration: {e}")
+            return False
+        
+        errors = self.validate_config(config)
+        if errors:
+            print("Config reload rejected, keeping current configuration:")
+            for error in errors:
+                print(f"  - {error}")
+            return False
+        
+        try:
+            changed = self.apply_config(config)
+        except Exception as e:
+            print(f"Config reload failed, keeping current configuration: {e}")
+            return False
+        
+        print(f"🔄 Config reloaded - changed: {', '.join(changed) if changed else 'nothing'}")
+        return True
+
+    def validate_config(self, config):
+        """Return a list of problems with a parsed config, empty if it is usable"""
+        if not isinstance(config, dict):
+            return ["top level must be a JSON object"]
+        
+        errors = []
+        
+        def is_positive(value, integer=False):
+            return not isinstance(value, bool) and isinstance(value, int if integer else (int, float)) and value > 0
+        
+        def check_positive(section, settings, keys, integer=False):
+            # Keys left out fall back to their defaults, so only check the ones given
+            for key in keys:
+                if key in settings and not is_positive(settings[key], integer):
+                    errors.append(f"{section}.{key} must be a positive {'integer' if integer else 'number'}")
+        
+        def check_search(name, search_filters):
+            for key in ('base_url', 'query'):
+                if not isinstance(search_filters.get(key), str) or not search_filters[key]:
+                    errors.append(f"{name} needs {key} as a non-empty string")
+            distance = search_filters.get('distance')
+            if distance is not None and (isinstance(distance, bool) or not isinstance(distance, (int, float)) or distance < 0):
+                errors.append(f"{name} distance must be a number of km")
+        
+        search_filters = config.get('search_filters')
+        if search_filters is not None:
+            if not isinstance(search_filters, dict):
+                errors.append("search_filters must be an object")
+            else:
+                check_search("search_filters", search_filters)
+        
+        price_limits = config.get('price_limits')
+        if price_limits is not None:
+            if not isinstance(price_limits, dict):
+                errors.append("price_limits must be an object")
+            else:
+                for model, limit in price_limits.items():
+                    if not is_positive(limit):
+                        errors.append(f"price limit for {model} must be a positive number")
+        
+        subscribers = config.get('subscribers')
+        if subscribers is not None:
+            if not isinstance(subscribers, list) or not all(isinstance(subscriber, dict) for subscriber in subscribers):
+                errors.append("subscribers must be a list of objects")
+            else:
+                names = [subscriber.get('name') for subscriber in subscribers]
+                if not all(isinstance(name, str) and name for name in names) or len(set(names)) != len(names):
+                    errors.append("every subscriber needs a unique name")
+                for subscriber in subscribers:
+                    name = subscriber.get('name')
+                    if not subscriber.get('chat_id'):
+                        errors.append(f"subscriber {name} needs a chat_id")
+                    limits = subscriber.get('price_limits')
+                    if not isinstance(limits, dict) or not limits:
+                        errors.append(f"subscriber {name} needs price_limits")
+                    elif not all(is_positive(limit) for limit in limits.values()):
+                        errors.append(f"subscriber {name} price limits must be positive numbers")
+                    profiles = subscriber.get('profiles', [])
+                    if not isinstance(profiles, list) or not all(isinstance(profile, str) for profile in profiles):
+                        errors.append(f"subscriber {name} profiles must be a list of profile names")
+        
+        user_agents = config.get('user_agents')
+        if user_agents is not None:
+            if not isinstance(user_agents, list) or not user_agents or not all(isinstance(ua, str) and ua for ua in user_agents):
+                errors.append("user_agents must be a non-empty list of strings")
+        
+        for flag in ('logging_enabled', 'verbose'):
+            if flag in config and not isinstance(config[flag], bool):
+                errors.append(f"{flag} must be true or false")
+        
+        if config.get('log_level', 'info') not in self.LOG_LEVELS:
+            errors.append(f"log_level must be one of {', '.join(self.LOG_LEVELS)}")
+        
+        parser_settings = config.get('parser_settings')
+        if parser_settings is not None:
+            if not isinstance(parser_settings, dict):
+                errors.append("parser_settings must be an object")
+            else:
+                if parser_settings.get('mode', 'inline') not in self.PARSER_MODES:
+                    errors.append(f"parser_settings.mode must be one of {', '.join(self.PARSER_MODES)}")
+                check_positive("parser_settings", parser_settings, ('workers',), integer=True)
+        
+        fetch_settings = config.get('fetch_settings')
+        if fetch_settings is not None:
+            if not isinstance(fetch_settings, dict):
+                errors.append("fetch_settings must be an object")
+            else:
+                if fetch_settings.get('mode', 'streaming') not in self.FETCH_MODES:
+                    errors.append(f"fetch_settings.mode must be one of {', '.join(self.FETCH_MODES)}")
+                # queue_size 0 would make the pipeline queues unbounded
+                check_positive("fetch_settings", fetch_settings, ('card_limit', 'watermark_overlap', 'full_scan_every', 'chunk_size', 'queue_size',
+                                                                   'classify_workers', 'filter_workers'), integer=True)
+        
+        watchlist_settings = config.get('watchlist_settings')
+        if watchlist_settings is not None:
+            if not isinstance(watchlist_settings, dict):
+                errors.append("watchlist_settings must be an object")
+            else:
+                if not isinstance(watchlist_settings.get('path', ''), str):
+                    errors.append("watchlist_settings.path must be a string")
+                check_positive("watchlist_settings", watchlist_settings, ('workers',), integer=True)
+                check_positive("watchlist_settings", watchlist_settings, ('min_interval', 'max_interval', 'backoff_factor', 'max_per_second'))
+        
+        search_profiles = config.get('search_profiles')
+        if search_profiles is not None:
+            if not isinstance(search_profiles, list) or not all(isinstance(profile, dict) for profile in search_profiles):
+                errors.append("search_profiles must be a list of objects")
+            else:
+                names = [profile.get('name') for profile in search_profiles]
+                if not all(isinstance(name, str) and name for name in names) or len(set(names)) != len(names):
+                    errors.append("every search profile needs a unique name")
+                # Profiles override search_filters, so check what each one will actually search with
+                base_filters = search_filters if isinstance(search_filters, dict) else self.default_settings['search_filters']
+                for profile in search_profiles:
+                    check_search(f"search profile {profile.get('name')}", {**base_filters, **profile})
+        
+        query_api = config.get('query_api', {})
+        if not isinstance(query_api, dict):
+            errors.append("query_api must be an object")
+        else:
+            port = query_api.get('port', 0)
+            if isinstance(port, bool) or not isinstance(port, int) or not 0 <= port <= 65535:
+                errors.append("query_api.port must be a port number")
+            check_positive("query_api", query_api, ('page_size',), integer=True)
+            if not isinstance(query_api.get('enabled', False), bool):
+                errors.append("query_api.enabled must be true or false")
+            for key in ('host', 'archive'):
+                if not isinstance(query_api.get(key, ''), str):
+                    errors.append(f"query_api.{key} must be a string")
+        
+        cluster = config.get('cluster', {})
+        if not isinstance(cluster, dict):
+            errors.append("cluster must be an object")
+        else:
+            if cluster.get('journal_mode', 'delete') not in self.JOURNAL_MODES:
+                errors.append(f"cluster.journal_mode must be one of {', '.join(self.JOURNAL_MODES)}")
+            check_positive("cluster", cluster, ('heartbeat_ttl', 'coordinator_interval'))
+        
+        request_pool = config.get('request_pool', {})
+        if not isinstance(request_pool, dict):
+            errors.append("request_pool must be an object")
+        else:
+            if not isinstance(request_pool.get('proxies', []), list):
+                errors.append("request_pool.proxies must be a list")
+            check_positive("request_pool", request_pool, ('backoff_base', 'backoff_max', 'circuit_cooldown', 'transport_retry_base', 'transport_retry_max'))
+            check_positive("request_pool", request_pool, ('circuit_threshold', 'max_attempts'), integer=True)
+        
+        telegram_config = config.get('telegram', {})
+        if not isinstance(telegram_config, dict):
+            errors.append("telegram must be an object")
+        elif telegram_config.get('enabled') and not (telegram_config.get('bot_token') and (telegram_config.get('chat_id') or config.get('subscribers'))):
+            errors.append("telegram needs bot_token and chat_id (or subscribers) when enabled")
+        
+        notification_settings = config.get('notification_settings', {})
+        if not isinstance(notification_settings, dict):
+            errors.append("notification_settings must be an object")
+        else:
+            check_positive("notification_settings", notification_settings, ('max_message_length', 'max_concurrent_sends'), integer=True)
+            check_positive("notification_settings", notification_settings, ('dedup_retention_days', 'max_messages_per_second', 'max_messages_per_chat_per_second'))
+            if is_positive(notification_settings.get('max_message_length'), integer=True) and notification_settings['max_message_length'] > 4096:
+                errors.append("notification_settings.max_message_length can't exceed Telegram's 4096 characters")
+            if not isinstance(notification_settings.get('include_description', True), bool):
+                errors.append("notification_settings.include_description must be true or false")
+        
+        return errors
+
+    def apply_config(self, config):
+        """Swap in a validated config, rebuilding only the parts that changed. Returns changed setting names."""
+        # Build everything first so a failure leaves the running configuration untouched
+        settings = {
+            name: copy.deepcopy(config.get(name, self.default_settings[name]))
+            for name in self.RELOADABLE_SETTINGS
+        }
+        settings['parser_settings'] = {**self.default_settings['parser_settings'], **settings['parser_settings']}
+        settings['fetch_settings'] = {**self.default_settings['fetch_settings'], **settings['fetch_settings']}
+        settings['watchlist_settings'] = {**self.default_settings['watchlist_settings'], **settings['watchlist_settings']}
+        
+        telegram_config = config.get('telegram', {})
+        bot_token = telegram_config.get('bot_token')
+        chat_id = telegram_config.get('chat_id')
+        telegram_enabled = bool(telegram_config.get('enabled', False) and bot_token)
+        # Only set to point the bot at a different Bot API server, e.g. the soak-test fake
+        telegram_api_url = telegram_config.get('api_base_url')
+        
+        # The Bot itself is created on the first notification
+        bot = self.bot if (bot_token, telegram_api_url) == (self.bot_token, self.telegram_api_url) else None
+        
+        # Optional proxies and backoff tuning for the request pool
+        request_pool_settings = config.get('request_pool', {})
+        request_pool = self.request_pool
+        if (request_pool is None or settings['user_agents'] != self.user_agents
+                or request_pool_settings != self.request_pool_settings):
+            request_pool = RequestPool(
+                settings['user_agents'],
+                self.headers,
+                proxies=request_pool_settings.get('proxies'),
+                settings=request_pool_settings
+            )
+        
+        # Notification settings
+        notification_settings = config.get('notification_settings', {})
+        
+        cluster_settings = {**self.CLUSTER_DEFAULTS, **config.get('cluster', {})}
+        query_api_settings = {**self.QUERY_API_DEFAULTS, **config.get('query_api', {})}
+        
+        changed = [name for name in self.RELOADABLE_SETTINGS if settings[name] != getattr(self, name)]
+        telegram_changed = (telegram_enabled, bot_token, chat_id, telegram_api_url) != (
+            getattr(self, 'telegram_enabled', None), self.bot_token, getattr(self, 'chat_id', None), self.telegram_api_url)
+        if telegram_changed:
+            changed.append('telegram')
+        if request_pool is not self.request_pool and self.request_pool is not None:
+            changed.append('request_pool')
+        query_api_changed = query_api_settings != self.query_api_settings
+        if query_api_changed and self.query_api_settings is not None:
+            changed.append('query_api')
+        
+        # Swap - the main loop only calls this between cycles
+        for name in self.RELOADABLE_SETTINGS:
+            setattr(self, name, settings[name])
+        self.bot_token = bot_token
+        self.telegram_api_url = telegram_api_url
+        self.chat_id = chat_id
+        self.telegram_enabled = telegram_enabled
+        self.bot = bot
+        self.request_pool = request_pool
+        self.request_pool_settings = request_pool_settings
+        self.cluster_settings = cluster_settings
+        self.max_message_length = notification_settings.get('max_message_length', 4000)
+        self.include_description = notification_settings.get('include_description', True)
+        # Connections in use at once - the rate itself is kept by the sender's token buckets
+        self.max_concurrent_sends = notification_settings.get('max_concurrent_sends', 10)
+        self.sender.configure(notification_settings.get('max_messages_per_second', 30),
+                              notification_settings.get('max_messages_per_chat_per_second', 1), self.max_concurrent_sends)
+        # OLX ads run for 30 days, renewals included a bit longer - older dedup entries are dropped
+        self.dedup_retention_days = notification_settings.get('dedup_retention_days', 60)
+        
+        global DEBUG
+        DEBUG = self.log_level == 'debug'
+        
+        # Rebuild derived state only where its inputs changed
+        if 'search_filters' in changed or 'search_profiles' in changed:
+            self.search_urls = {}
+        if self.subscriber_index is None or {'price_limits', 'subscribers', 'telegram'} & set(changed):
+            self.subscriber_index = SubscriberIndex(self.subscribers or [
+                {'name': DEFAULT_SUBSCRIBER, 'chat_id': self.chat_id, 'price_limits': self.price_limits}])
+            if self.subscribers:
+                print(f"👥 {len(self.subscriber_index)} subscribers indexed across {len(self.subscriber_index.limits)} models")
+        if 'parser_settings' in changed or 'log_level' in changed:
+            # Restarted lazily with the new worker count on the next parse
+            self.shutdown_parser_pool()
+        if ('parser_settings' in changed or 'fetch_settings' in changed) and self.parser_settings.get('mode') == 'process_pool' \
+                and self.fetch_settings.get('mode') == 'streaming':
+            print("⚠️ parser_settings.mode 'process_pool' has no effect with fetch_settings.mode 'streaming' - "
+                  "streaming parses cards as they download; set fetch_settings.mode to 'buffered' to use the pool")
+        if telegram_changed:
             if self.telegram_enabled:
-                self.bot = Bot(token=self.bot_token)
                 print(f"Telegram notifications enabled for chat ID: {self.chat_id}")
             else:
                 print("Telegram notifications disabled")
-            
-            # Notification settings
-            notification_settings = config.get('notification_settings', {})
-            self.max_message_length = notification_settings.get('max_message_length', 4000)
-            self.include_description = notification_settings.get('include_description', True)
-            
-        except FileNotFoundError:
-            print("config.json not found - Telegram notifications disabled")
-            self.telegram_enabled = False
+        # Load previously notified listings to persist across restarts - even with Telegram off,
+        # since the snapshot written this run must not replace the history with an empty set
+        if not self.notified_listings_loaded:
+            self.load_notified_listings()
+        if query_api_changed:
+            self.configure_query_api(query_api_settings)
+        
+        return changed
+
+    def configure_query_api(self, settings):
+        """(Re)start the listing archive and query API for new query_api settings"""
+        self.stop_query_api()
+        self.query_api_settings = settings
+        if not settings['enabled']:
+            return
+        
+        path = settings['archive']
+        if self.worker_id:
+            root, ext = os.path.splitext(path)
+            path = f"{root}-{self.worker_id}{ext}"
+        try:
+            self.archive = ListingArchive(path)
+            self.query_api = ListingQueryAPI(path, settings['host'], settings['port'], page_size=settings['page_size'])
+            self.query_api.start()
+            print(f"📊 Query API serving {path} at {self.query_api.address}")
         except Exception as e:
-            print(f"Error loading config: {e}")
-            self.telegram_enabled = False
+            # Monitoring goes on without it
+            print(f"Query API could not start: {e}")
+            self.stop_query_api()
+
+    def stop_query_api(self):
+        if self.query_api is not None:
+            self.query_api.shutdown()
+            self.query_api = None
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
+    def archive_offers(self, profile, offers, events):
+        """Record a search's offers in the listing archive for the query API"""
+        try:
+            self.archive.record(profile['name'], [(self.listing_id(offer.link), offer) for offer in offers], events, time.time())
+        except Exception as e:
+            print(f"Error writing listing archive: {e}")
+
+    def open_store(self):
+        """Connect to the shared cluster store once"""
+        if self.store is None:
+            self.store = SharedStore(self.cluster_settings['store'], journal_mode=self.cluster_settings['journal_mode'])
+            if self.worker_id:
+                self.check_worker_id_free()
+        return self.store
+
+    def check_worker_id_free(self):
+        """Refuse an ID that a live process on this host still uses - state files are named after it"""
+        running = self.store.worker_process(self.worker_id)
+        if not running or running[0] != platform.node() or running[1] == os.getpid():
+            return
+        try:
+            os.kill(running[1], 0)
+        except ProcessLookupError:
+            return  # left over from before a restart
+        except PermissionError:
+            pass
+        self.store.close()
+        self.store = None
+        raise RuntimeError(f"worker {self.worker_id} is already running here as pid {running[1]} - start this one with its own --worker ID")
+
+    def start_heartbeat(self):
+        """Join the cluster and keep showing we're alive until stop_heartbeat()"""
+        if self.heartbeat is None:
+            self.heartbeat = WorkerHeartbeat(self)
+            self.heartbeat.start()
+
+    def stop_sender(self, timeout=30):
+        """Let queued notifications go out and record them before exiting"""
+        self.finish_deliveries(timeout=timeout)
+        if self.sending:
+            print(f"⚠️ {len(self.sending)} notification(s) still queued at exit - they'll be retried next start")
+        self.sender.stop()
+
+    def stop_heartbeat(self):
+        if self.heartbeat is not None:
+            self.heartbeat.stop()
+            self.heartbeat = None
 
     def load_notified_listings(self):
         """Load previously notified listings from file"""
+        # The binary snapshot is much faster to load than the text history
+        if self.load_state_snapshot():
+            return
+        
         try:
-            with open('notified_listings.txt', 'r') as f:
-                self.notified_listings = set(line.strip() for line in f if line.strip())
+            loaded_at = time.time()
+            notified = {}
+            with open(self.notified_listings_path, 'r') as f:
+                for line in f:
+                    # 'key<TAB>sent at' - older files have bare links, which count as sent now
+                    key, _, notified_at = line.strip().partition('\t')
+                    if key:
+                        notified[key] = float(notified_at) if notified_at else loaded_at
+            self.notified_listings = notified
+            self.notified_listings_loaded = True
             print(f"Loaded {len(self.notified_listings)} previously notified listings")
         except FileNotFoundError:
+            self.notified_listings_loaded = True
             print("No previous notification history found")
         except Exception as e:
             print(f"Error loading notification history: {e}")
 
-    def save_notified_listings(self):
-        """Save notified listings to file"""
+    def save_notified_listings(self, keys):
+        """Append newly notified delivery keys to the history file"""
         try:
-            with open('notified_listings.txt', 'w') as f:
-                for listing_url in self.notified_listings:
-                    f.write(f"{listing_url}\n")
+            with open(self.notified_listings_path, 'a') as f:
+                for key in keys:
+                    f.write(f"{key}\t{self.notified_listings[key]:.0f}\n")
+            self.state_dirty = True
         except Exception as e:
             print(f"Error saving notification history: {e}")
 
-    async def send_telegram_message(self, listing):
-        """Send Telegram message for a new listing"""
-        if not self.telegram_enabled:
+    def prune_notified_listings(self):
+        """Forget notifications older than dedup_retention_days and compact the history file, at most daily"""
+        now = time.time()
+        if not self.notified_listings_loaded or now - self.notified_pruned_at < 86400:
+            return
+        self.notified_pruned_at = now
+        
+        cutoff = now - self.dedup_retention_days * 86400
+        kept = {key: notified_at for key, notified_at in self.notified_listings.items() if notified_at >= cutoff}
+        dropped = len(self.notified_listings) - len(kept)
+        self.notified_listings = kept
+        try:
+            tmp_path = self.notified_listings_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                for key, notified_at in kept.items():
+                    f.write(f"{key}\t{notified_at:.0f}\n")
+            os.replace(tmp_path, self.notified_listings_path)
+            self.state_dirty = True
+        except Exception as e:
+            print(f"Error compacting notification history: {e}")
+        if self.store is not None:
+            dropped += self.store.prune_sent(cutoff)
+        if dropped:
+            print(f"🧹 Forgot {dropped} notifications older than {self.dedup_retention_days} days")
+
+    def load_state_snapshot(self):
+        """Load dedup and watermark state from the binary snapshot if it's not older than the text history"""
+        try:
+            snapshot_mtime = os.path.getmtime(self.state_snapshot_path)
+        except OSError:
             return False
         
+        # notified_listings.txt is written on every notification, the snapshot once per cycle,
+        # so a newer text file means we stopped mid-cycle and the snapshot is stale
         try:
-            message = f"🍎 *New iPhone Deal Found!*\n\n"
-            message += f"📱 *Model:* {listing['phone_name']}\n"
-            message += f"💰 *Price:* {listing['price']} zł\n"
-            
-            if (self.include_description and 
-                listing['description'] and 
-                listing['description'] != "No description available"):
-                desc = listing['description']
-                if len(desc) > 200:
-                    desc = desc[:200] + "..."
-                message += f"📝 *Description:* {desc}\n"
-            
-            message += f"🔗 [View Listing]({listing['link']})"
-            
-            # Ensure message isn't too long
-            if len(message) > self.max_message_length:
-                message = message[:self.max_message_length-10] + "..."
-            
-            await self.bot.send_message(
-                chat_id=self.chat_id,
-                text=message,
-                parse_mode='Markdown',
-                disable_web_page_preview=False
-            )
+            history_mtime = os.path.getmtime(self.notified_listings_path)
+        except OSError:
+            history_mtime = 0
+        if snapshot_mtime < history_mtime:
+            print(f"State snapshot is older than {self.notified_listings_path} - loading text history instead")
+            return False
+        
+        try:
+            with open(self.state_snapshot_path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('version') != self.STATE_SNAPSHOT_VERSION:
+                print("State snapshot has an old format - loading text history instead")
+                return False
+        except Exception as e:
+            print(f"Error loading state snapshot: {e}")
+            return False
+        
+        self.notified_listings = state['notified_listings']
+        self.notified_pruned_at = state.get('notified_pruned_at', 0.0)
+        self.seen_listings = state['seen_listings']
+        self.watermarks = state['watermarks']
+        self.search_snapshots = state['search_snapshots']
+        self.watchlist.restore(state['watchlist'])
+        self.notified_listings_loaded = True
+        print(f"Loaded state snapshot: {len(self.notified_listings)} notified listings, {len(self.watermarks)} watermarks")
+        return True
+
+    def save_state_snapshot(self):
+        """Write dedup and watermark state to the binary snapshot if anything changed"""
+        # A snapshot without the history would be newer than notified_listings.txt and shadow it
+        if not self.state_dirty or not self.notified_listings_loaded:
+            return
+        
+        state = {
+            'version': self.STATE_SNAPSHOT_VERSION,
+            'notified_listings': self.notified_listings,
+            'notified_pruned_at': self.notified_pruned_at,
+            'seen_listings': self.seen_listings,
+            'watermarks': self.watermarks,
+            'search_snapshots': self.search_snapshots,
+            'watchlist': self.watchlist.state()
+        }
+        try:
+            # Write to a temp file first so a crash never leaves a half-written snapshot
+            tmp_path = self.state_snapshot_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.state_snapshot_path)
+            self.state_dirty = False
+        except Exception as e:
+            print(f"Error saving state snapshot: {e}")
+
+    def update_watermark(self, search_url, offers):
+        """Remember the newest links seen for a search (newest first)"""
+        newest = [offer.link for offer in offers[:self.WATERMARK_SIZE]]
+        if newest and self.watermarks.get(search_url) != newest:
+            self.watermarks[search_url] = newest
+            self.state_dirty = True
+            if self.store is not None:
+                self.store.set_watermark(search_url, newest)
+
+    def listing_id(self, link):
+        """OLX listing ID from an offer URL, or the URL itself if it has none"""
+        match = LISTING_ID.search(link)
+        return match.group(1) if match else link
+
+    def snapshot_price(self, search_url, link):
+        """Price of a listing in the previous snapshot of a search, or None"""
+        snapshot = self.search_snapshots.get(search_url)
+        if not snapshot:
+            return None
+        entry = snapshot['entries'].get(self.listing_id(link))
+        return entry[0] if entry else None
+
+    def diff_search_snapshot(self, search_url, offers):
+        """Snapshot this cycle's offers and diff them against the previous snapshot of the same search.
+
+        One pass over each snapshot. Previous entries below the part of the page read this cycle are
+        carried over until they drop off the page. Returns event dicts of type 'new', 'price_changed' or 'removed'."""
+        now = time.time()
+        previous = self.search_snapshots.get(search_url)
+        previous_entries = previous['entries'] if previous else {}
+        
+        entries = {}
+        events = []
+        new_regular = 0
+        last_regular_position = -1
+        
+        for position, offer in enumerate(offers):
+            listing_id = self.listing_id(offer.link)
+            if listing_id in entries:
+                continue
             
-            print(f"📱 Telegram notification sent for {listing['phone_name']}")
-            return True
+            # Already parsed by the classify stage
+            price = offer.price
+            promoted = offer.promoted
+            old = previous_entries.get(listing_id)
+            first_seen = old[2] if old else now
+            entries[listing_id] = (price, position, first_seen, offer.link, offer.title, promoted)
             
+            if not promoted:
+                last_regular_position = position
+            
+            # The first snapshot of a search is only a baseline
+            if previous is None:
+                continue
+            if old is None:
+                if not promoted:
+                    new_regular += 1
+                events.append({'type': 'new', 'id': listing_id, 'link': offer.link, 'title': offer.title,
+                               'price': price, 'position': position})
+            elif old[0] != price:
+                events.append({'type': 'price_changed', 'id': listing_id, 'link': offer.link, 'title': offer.title,
+                               'price': price, 'old_price': old[0], 'position': position})
+        
+        if previous is not None:
+            page_size = self.fetch_settings.get('card_limit', 50)
+            for listing_id, old in previous_entries.items():
+                # Promoted ads rotate between requests, so their absence means nothing
+                if listing_id in entries or old[5]:
+                    continue
+                # Older listings only move down as new ones arrive - one that should still be
+                # inside the part of the page we read but isn't there was removed or sold
+                position = old[1] + new_regular
+                if position < last_regular_position:
+                    events.append({'type': 'removed', 'id': listing_id, 'link': old[3], 'title': old[4],
+                                   'price': old[0], 'first_seen': old[2], 'last_seen': previous['taken_at'],
+                                   'removed_at': now})
+                elif position < page_size:
+                    # Not read this cycle (the watermark stopped the download) - keep it for the next full read
+                    entries[listing_id] = (old[0], position) + old[2:]
+        
+        self.search_snapshots[search_url] = {'taken_at': now, 'entries': entries}
+        self.state_dirty = True
+        return events
+
+    def handle_snapshot_events(self, events):
+        """Report price changes and write removed/sold listings to the history file"""
+        new_count = 0
+        for event in events:
+            if event['type'] == 'new':
+                new_count += 1
+            elif event['type'] == 'price_changed':
+                arrow = '📉' if (event['price'] or 0) < (event['old_price'] or 0) else '📈'
+                print(f"{arrow} Price changed: {event['title']} | {event['old_price']} zł -> {event['price']} zł | {event['link']}")
+            elif event['type'] == 'removed':
+                print(f"🏷️ Removed/sold: {event['title']} | {event['price']} zł | {event['link']}")
+                self.record_listing_history(event)
+        
+        if new_count:
+            print(f"🆕 {new_count} new listings since the last cycle")
+
+    def record_listing_history(self, event):
+        """Append a removed/sold listing to listing_history.jsonl"""
+        try:
+            record = {
+                'id': event['id'],
+                'link': event['link'],
+                'title': event['title'],
+                'model': self.identify_phone_model(event['title']),
+                'price': event['price'],
+                'first_seen': datetime.fromtimestamp(event['first_seen']).isoformat(timespec='seconds'),
+                'last_seen': datetime.fromtimestamp(event['last_seen']).isoformat(timespec='seconds'),
+                'removed_at': datetime.fromtimestamp(event['removed_at']).isoformat(timespec='seconds'),
+                # Upper bound - it went away some time between last_seen and removed_at
+                'hours_listed': round((event['removed_at'] - event['first_seen']) / 3600, 1)
+            }
+            with open(self.history_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
         except Exception as e:
-            print(f"Telegram error: {e}")
+            print(f"Error writing listing history: {e}")
+
+    def stage(self, name):
+        """Profiled section of run(), a no-op unless --profile is on"""
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.stage(name)
+
+    def mark_startup(self, label):
+        """Record a start-up milestone until the first cycle has finished"""
+        if self.startup_timings is not None:
+            self.startup_timings.append((label, time.perf_counter()))
+
+    def print_startup_report(self):
+        """Print how long each start-up phase took, once"""
+        if not self.startup_timings:
+            return
+        
+        print("\n⏱️ Start-up timing:")
+        previous = STARTUP_STARTED
+        for label, at in self.startup_timings:
+            print(f"  {label:<22} +{(at - previous) * 1000:7.1f} ms  (at {(at - STARTUP_STARTED) * 1000:7.1f} ms)")
+            previous = at
+        self.startup_timings = None
+
+    def format_listing_message(self, listing):
+        """Markdown notification for a listing - built once however many chats receive it"""
+        if listing.previous_price:
+            message = f"📉 *iPhone Price Drop!*\n\n"
+            message += f"📱 *Model:* {listing.phone_name}\n"
+            message += f"💰 *Price:* {listing.price} zł (was {listing.previous_price} zł)\n"
+        else:
+            message = f"🍎 *New iPhone Deal Found!*\n\n"
+            message += f"📱 *Model:* {listing.phone_name}\n"
+            message += f"💰 *Price:* {listing.price} zł\n"
+        
+        if (self.include_description and 
+            listing.description and 
+            listing.description != "No description available"):
+            desc = listing.description
+            if len(desc) > 200:
+                desc = desc[:200] + "..."
+            message += f"📝 *Description:* {desc}\n"
+        
+        message += f"🔗 [View Listing]({listing.link})"
+        
+        # Ensure message isn't too long
+        if len(message) > self.max_message_length:
+            message = message[:self.max_message_length-10] + "..."
+        return message
+
+    async def send_telegram_message(self, listing):
+        """Send Telegram message for a new listing"""
+        if not self.telegram_enabled:
+            return False
+        
+        sent = await self.send_markdown(self.chat_id, self.format_listing_message(listing))
+        if sent:
+            print(f"📱 Telegram notification sent for {listing.phone_name}")
+        return sent
+
+    async def send_markdown(self, chat_id, message, preview=True, attempts=3):
+        if not self.telegram_enabled:
+            return False
+        for attempt in range(attempts):
+            try:
+                async with self.sender.turn(chat_id):
+                    await self.get_bot().send_message(
+                        chat_id=chat_id,
+                        text=message,
+                        parse_mode='Markdown',
+                        disable_web_page_preview=not preview
+                    )
+                return True
+                
+            except telegram.error.RetryAfter as e:
+                # Flood control despite the buckets - every send waits as long as Telegram asks
+                delay = e.retry_after
+                self.sender.back_off(delay.total_seconds() if hasattr(delay, 'total_seconds') else delay)
+                if attempt + 1 == attempts:
+                    print(f"Telegram error ({chat_id}): {e}")
+                    return False
+            except Exception as e:
+                print(f"Telegram error ({chat_id}): {e}")
+                return False
+
+    async def send_fanout(self, message, recipients):
+        """Send one message to many chats concurrently. Returns {delivery key: sent}."""
+        keys = list(recipients)
+        # The sender bounds how many are in flight and how fast they go
+        results = await asyncio.gather(*(self.send_markdown(recipients[key]['chat_id'], message) for key in keys))
+        return dict(zip(keys, results))
+
+    def get_bot(self):
+        """Telegram Bot, created on first use"""
+        if self.bot is None:
+            options = {'base_url': self.telegram_api_url} if self.telegram_api_url else {}
+            self.bot = telegram.Bot(token=self.bot_token, **options)
+        return self.bot
+
+    async def send_telegram_text(self, message):
+        """Send a ready-made Markdown message"""
+        if not self.telegram_enabled or not self.chat_id:
             return False
+        return await self.send_markdown(self.chat_id, message[:self.max_message_length], preview=False)
+
+    def deliver_listing(self, listing, recipients):
+        """Wrapper fanning one listing out to {delivery key: subscriber}"""
+        message = self.format_listing_message(listing)
+        return self.run_telegram(lambda: self.send_fanout(message, recipients)) or {}
+
+    def queue_listing(self, listing, recipients):
+        """Fan one listing out in the background; finish_deliveries() records each recipient as they're done"""
+        message = self.format_listing_message(listing)
+        delivery = {'listing': listing, 'remaining': len(recipients), 'sent': [], 'failed': []}
+        for key, subscriber in recipients.items():
+            self.sending.add(key)
+            self.sender.submit(self.send_markdown(subscriber['chat_id'], message), (delivery, key, subscriber))
+
+    def finish_deliveries(self, timeout=0):
+        """Record queued sends as they finish, until none are left or timeout seconds have passed.
+
+        A sent key is recorded within moments, so a crash can't leave many sent-but-unrecorded
+        outbox claims for another worker to adopt and send again."""
+        deadline = time.monotonic() + timeout
+        while self.sending:
+            results = self.sender.take_results(max(0.0, deadline - time.monotonic()))
+            if not results:
+                return
+            sent = [key for (_, key, _), ok in results if ok]
+            failed = [key for (_, key, _), ok in results if not ok]
+            self.sending.difference_update(key for (_, key, _), _ in results)
+            if sent:
+                sent_at = time.time()
+                self.notified_listings.update((key, sent_at) for key in sent)
+                self.save_notified_listings(sent)
+                self.state_dirty = True
+                if self.store is not None:
+                    self.store.mark_sent(sent)
+            if failed and self.store is not None:
+                self.store.release(failed)
+            
+            for (delivery, _, subscriber), ok in results:
+                delivery['sent' if ok else 'failed'].append(subscriber['name'])
+                delivery['remaining'] -= 1
+                if not delivery['remaining']:
+                    self.report_delivery(delivery)
+
+    def report_delivery(self, delivery):
+        """One log line per listing once all of its recipients are done"""
+        listing = delivery['listing']
+        sent, failed = delivery['sent'], delivery['failed']
+        if sent:
+            audience = f" → {len(sent)} subscriber(s)" if self.subscribers else ''
+            print(f"Notification sent: {listing.title} | {listing.price_text} | {listing.link} (Model: {listing.phone_name}){audience}")
+        if failed:
+            audience = f" ({', '.join(failed[:5])}{'...' if len(failed) > 5 else ''})" if self.subscribers else ''
+            print(f"Notification FAILED: {listing.title} | {listing.link}{audience}")
 
     def send_telegram_notification(self, listing):
         """Wrapper to run async Telegram sending"""
+        return self.run_telegram(lambda: self.send_telegram_message(listing))
+
+    def run_telegram(self, make_coroutine):
+        """Run a Telegram coroutine to completion from synchronous code"""
         try:
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    # If already running, create a new task and wait for it
-                    import threading
-                    result_container = {}
-                    def run_task():
-                        result_container['result'] = loop.run_until_complete(self.send_telegram_message(listing))
-                    t = threading.Thread(target=run_task)
-                    t.start()
-                    t.join()
-                    return result_container['result']
-                else:
-                    return loop.run_until_complete(self.send_telegram_message(listing))
-            except RuntimeError:
-                # No event loop, use asyncio.run
-                return asyncio.run(self.send_telegram_message(listing))
+            # On the sender's loop, so it shares the rate limits with queued fan-outs
+            return self.sender.run(make_coroutine())
         except Exception as e:
             print(f"Error in Telegram notification wrapper: {e}")
             return False
@@ -564,7 +3252,7 @@ class OLXiPhoneScraper:
             with open('logs.txt', 'a', encoding='utf-8') as f:
                 f.write(f"\n[UNFILTERED] Cycle at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                 for listing in listings[:10]:
-                    f.write(f" | {listing['price']} zł | {listing['link']}\n")
+                    f.write(f" | {listing.price} zł | {listing.link}\n")
                 f.write("-" * 50 + "\n")
         except Exception as e:
             print(f"Error writing to logs.txt: {e}")
@@ -592,158 +3280,156 @@ class OLXiPhoneScraper:
         except Exception as e:
             print(f"Error trimming logs file: {e}")
 
-    def get_first10_unfiltered_offers(self):
-        """Scrape the first 10 offers from the OLX page, without any filtering."""
-        search_url = self.build_search_url()
+    def poll_search(self, search_url):
+        """Fetch one search and notify about its deals through the staged pipeline.
+
+        Returns every offer on the page, newest first, for logging, diffing and the watermark."""
+        streaming = self.fetch_settings.get('mode') == 'streaming'
+        offers = []
+        pipeline = Pipeline(queue_size=self.fetch_settings.get('queue_size', 32))
+        pipeline.stage('extract', self.make_extract_stage(search_url, pipeline, streaming))
+        pipeline.stage('classify', lambda listing: self.classify_listing(listing, offers),
+                       workers=self.fetch_settings.get('classify_workers', 1))
+        profile = self.active_profile['name'] if self.active_profile else None
+        pipeline.stage('filter', lambda listing: self.filter_listing(listing, profile),
+                       workers=self.fetch_settings.get('filter_workers', 1))
+        
+        notified = 0
+        notify_busy = 0.0
+        try:
+            if DEBUG:
+                print(f"[DEBUG] Fetching search URL: {search_url}")
+            self.mark_startup('first poll sent')
+            
+            # Dedup and notify run on this thread - it owns the Telegram event loop and the store connection
+            for listing, subscribers in pipeline.run(self.fetch_search_page(search_url, streaming)):
+                started = time.perf_counter()
+                notified += self.notify_listing(listing, subscribers, search_url)
+                notify_busy += time.perf_counter() - started
+        except (RequestPoolExhausted, requests.ConnectionError, requests.Timeout):
+            # Every profile would fail the same way - the main loop waits for the pool and retries
+            raise
+        except Exception as e:
+            print(f"Error fetching unfiltered offers: {e}")
+            return []
+        
+        if self.verbose:
+            print(f"⏱️ Pipeline: {pipeline.summary()} → notify {notified} queued in {notify_busy * 1000:.0f} ms")
+        
+        # Classify may run several workers, so restore page order
+        offers.sort(key=lambda listing: listing.position)
+        self.update_watermark(search_url, offers)
+        return offers
+
+    def fetch_search_page(self, search_url, streaming):
+        """Pipeline source: the whole page in buffered mode, decoded HTML chunks then None in streaming mode"""
+        if not streaming:
+            page = self.prefetched.pop(search_url, None)
+            yield page if page is not None else self.fetch_buffered_page(search_url)
+            return
+        
+        response = self.request_pool.get(search_url, timeout=15, stream=True)
         try:
-            # Rotate user agents to prevent blocking
-            self.headers['User-Agent'] = random.choice(self.user_agents)
-            print(f"[DEBUG] Fetching search URL: {search_url}")
-            response = requests.get(search_url, headers=self.headers, timeout=15)
             response.raise_for_status()
+            if DEBUG:
+                print(f"[DEBUG] Got response status: {response.status_code}")
             
-            # HTML debugging disabled for better performance
-            # Uncomment next 3 lines if debugging is needed
-            # with open('last_response.html', 'w', encoding='utf-8') as f:
-            #     f.write(response.text)
-            # print(f"[DEBUG] Saved response to last_response.html for inspection")
-                
+            decoder = codecs.getincrementaldecoder(response_charset(response))(errors='replace')
+            # iter_content undoes gzip/deflate/br as the compressed bytes arrive
+            for chunk in response.iter_content(chunk_size=self.fetch_settings.get('chunk_size', 16384)):
+                yield decoder.decode(chunk)
+            yield decoder.decode(b'', final=True)
+            yield None  # end of page
+        finally:
+            # Closing mid-body drops the connection, so the rest of the page is never downloaded
+            response.close()
+
+    def fetch_buffered_page(self, search_url):
+        """Download a whole search page and submit it for parsing. Returns (content, future)."""
+        response = self.request_pool.get(search_url, timeout=15)
+        response.raise_for_status()
+        if DEBUG:
             print(f"[DEBUG] Got response status: {response.status_code}")
+        return self.submit_search_page(response.content)
+
+    def make_extract_stage(self, search_url, pipeline, streaming):
+        """Pipeline stage turning page content into Listing records"""
+        if not streaming:
+            return self.parsed_search_page
+        
+        card_limit = self.fetch_settings.get('card_limit', 50)
+        overlap_needed = self.fetch_settings.get('watermark_overlap', 3)
+        watermark = set(self.watermarks.get(search_url, ()))
+        # Price drops and removals further down the page are only seen on a full read
+        partial_scans = self.partial_scans.get(search_url, 0) + 1
+        if partial_scans >= self.fetch_settings.get('full_scan_every', 5):
+            watermark = set()
+            partial_scans = 0
+        self.partial_scans[search_url] = partial_scans
+        parser = SearchPageStreamParser()
+        received = 0
+        emitted = 0
+        known_in_a_row = 0
+        finished = False
+        
+        def extract(text):
+            nonlocal received, emitted, known_in_a_row, finished
+            # Chunks read before the source noticed we stopped are ignored
+            if finished:
+                return
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if text is None:
+                parser.close()
+            else:
+                received += len(text)
+                parser.feed(text)
             
-            # Try to find any links to listings directly
-            all_links = soup.find_all('a', href=re.compile(r'/d/oferta/'))
-            if all_links:
-                print(f"[DEBUG] Found {len(all_links)} direct offer links")
+            for listing in parser.take_offers():
+                listing.position = emitted
+                yield listing
+                emitted += 1
                 
-            # Find listing containers with multiple selectors
-            listing_selectors = [
-                {'data-cy': 'l-card'},
-                {'data-testid': 'listing-grid'},
-                {'class': re.compile(r'css-.*')},
-                {'class': re.compile(r'offer-wrapper', re.I)},
-                {'class': re.compile(r'.*listing.*', re.I)}
-            ]
+                # Promoted ads are pinned out of date order so they don't count either way
+                if not listing.promoted:
+                    known_in_a_row = known_in_a_row + 1 if listing.link in watermark else 0
+                
+                if emitted >= card_limit:
+                    if DEBUG:
+                        print(f"[DEBUG] Card limit reached after {received // 1024} KB - closing connection")
+                    finished = True
+                elif watermark and known_in_a_row >= overlap_needed:
+                    if DEBUG:
+                        print(f"[DEBUG] Watermark reached after {received // 1024} KB - closing connection")
+                    finished = True
+                if finished:
+                    pipeline.stop_source()
+                    return
             
-            listings = []
-            for selector in listing_selectors:
-                found = soup.find_all('div', selector)
-                if found:
-                    print(f"[DEBUG] Found {len(found)} listings with selector {selector}")
-                    listings = found
-                    break
-                    
-            if not listings:
-                print("[DEBUG] No listings found with standard selectors. Trying direct link approach...")
-                # If no listings found with standard selectors, try to construct them from links
-                if all_links:
-                    # Find common parent elements that might be listing containers
-                    for link in all_links[:15]:
-                        # Try to find parent div that might be a listing container
-                        parent = link
-                        for _ in range(3):  # Look up to 3 levels up in the DOM
-                            if parent and parent.name == 'div':
-                                listings.append(parent)
-                                break
-                            parent = parent.parent if parent else None
-            
-            print(f"[DEBUG] Processing {len(listings)} potential listings")
-            offers = []
-            processed = 0
-            
-            for listing in listings:
-                processed += 1
-                try:
-                    # Extract title with multiple approaches
-                    title_elem = None
-                    
-                    # Try to find title in various elements
-                    title_selectors = [
-                        {'data-cy': 'listing-ad-title'},
-                        {'data-testid': 'ad-title'},
-                        {'class': re.compile(r'title', re.I)}
-                    ]
-                    
-                    for selector in title_selectors:
-                        elements = listing.find_all(['h6', 'h5', 'h4', 'h3', 'a'], selector)
-                        if elements:
-                            title_elem = elements[0]
-                            break
-                    
-                    if not title_elem:
-                        # Fall back to any heading or anchor
-                        title_elem = listing.find(['h6', 'h5', 'h4', 'h3']) or listing.find('a')
-                        
-                    if not title_elem:
-                        print(f"[DEBUG] Listing #{processed}: No title element found")
-                        continue
-                        
-                    title = title_elem.get_text(strip=True)
-                    
-                    # Extract price with multiple approaches
-                    price_elem = None
-                    price_selectors = [
-                        {'data-testid': 'ad-price'},
-                        {'data-cy': 'ad-price'},
-                        {'class': re.compile(r'price', re.I)}
-                    ]
-                    
-                    for selector in price_selectors:
-                        elements = listing.find_all(['p', 'span', 'div'], selector)
-                        if elements:
-                            price_elem = elements[0]
-                            break
-                    
-                    if not price_elem:
-                        # Fall back to any element with price-like text
-                        for elem in listing.find_all(['p', 'span', 'div']):
-                            text = elem.get_text(strip=True)
-                            if 'zł' in text or 'PLN' in text:
-                                price_elem = elem
-                                break
-                                
-                    price_text = price_elem.get_text(strip=True) if price_elem else ''
-                    
-                    # Extract link - most important part
-                    link = None
-                    
-                    # Find all links in this listing
-                    link_elems = listing.find_all('a', href=True)
-                    for link_elem in link_elems:
-                        href = link_elem['href']
-                        # Check for OLX listing pattern
-                        if 'oferta' in href:
-                            link = href
-                            break
-                            
-                    if not link:
-                        print(f"[DEBUG] Listing #{processed}: No link found")
-                        continue
-                        
-                    if link.startswith('/'):
-                        link = 'https://www.olx.pl' + link
-                        
-                    print(f"[DEBUG] Found listing: '{title[:30]}...' | {price_text} | {link}")
-                    
-                    offers.append({
-                        'title': title,
-                        'price': price_text,
-                        'link': link
-                    })
-                    
-                    if len(offers) >= 50:  # Increased from 10 to catch more listings
-                        break
-                        
-                except Exception as e:
-                    print(f"[DEBUG] Error processing listing #{processed}: {e}")
-                    continue
-                    
-            print(f"[DEBUG] Found {len(offers)} valid offers out of {len(listings)} listings")
-            return offers
-        except Exception as e:
-            print(f"Error fetching unfiltered offers: {e}")
-            return []
+            if text is None or parser.state_blob_parsed:
+                finished = True
+                pipeline.stop_source()
+            
+            if text is None and not emitted and not parser.state_blob_parsed:
+                # The stream parser only knows l-card markup - the full parser has every fallback selector
+                print(f"⚠️ Streaming parser found no offers on {search_url} - refetching it for the full parser")
+                yield from self.parsed_search_page(self.fetch_buffered_page(search_url))
+        
+        return extract
+
+    def classify_listing(self, listing, offers):
+        """Pipeline stage: phone model and numeric price, filled in on the record itself"""
+        listing.phone_model = self.identify_phone_model(listing.title)
+        listing.price = self.extract_price(listing.price_text)
+        offers.append(listing)
+        yield listing
+
+    def filter_listing(self, listing, profile):
+        """Pipeline stage: pairs an identified listing with every subscriber whose limit it is under"""
+        subscribers = self.subscriber_index.match(listing.phone_model, listing.price, profile)
+        if subscribers:
+            yield listing, subscribers
+        elif DEBUG:
+            print(f"[DEBUG] {listing.title} | {listing.price_text} | {listing.link} => not eligible for notification (model/price filter)")
 
     def log_first10_unfiltered_offers(self, offers):
         try:
@@ -754,181 +3440,255 @@ class OLXiPhoneScraper:
             with open('logs.txt', 'a', encoding='utf-8') as f:
                 f.write(f"\n[UNFILTERED] Cycle at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                 for offer in offers:
-                    f.write(f"{offer['title']} | {offer['price']} | {offer['link']}\n")
+                    f.write(f"{offer.title} | {offer.price_text} | {offer.link}\n")
                 f.write("-" * 50 + "\n")
         except Exception as e:
             print(f"Error writing unfiltered offers to logs.txt: {e}")
 
-    def notify_unfiltered_newest(self):
-        """Check the 10 newest unfiltered offers and send notification if not already sent and matches price/model filter. Debug log for each."""
-        offers = self.get_first10_unfiltered_offers()
-        notified = 0
+    def notify_listing(self, listing, subscribers, search_url):
+        """Dedup one eligible listing and queue it for its matching subscribers. Returns how many were queued."""
+        link = listing.link
+        # Only format the per-offer trace when debug output is enabled
+        debug_msg = f"[DEBUG] {listing.title} | {listing.price_text} | {link} => " if DEBUG else ''
+        recipients = {delivery_key(link, subscriber['name']): subscriber for subscriber in subscribers}
+        pending = {key: subscriber for key, subscriber in recipients.items()
+                   if key not in self.notified_listings and key not in self.sending}
+        # In sharded mode another worker may have sent it, e.g. just before a rebalance
+        if pending and self.store is not None:
+            already = self.store.notified_keys(pending)
+            pending = {key: subscriber for key, subscriber in pending.items() if key not in already}
+        if not pending:
+            if DEBUG:
+                print(debug_msg + "already notified, skipping.")
+            return 0
         
-        # Debug - check if our target listing is in the unfiltered offers
-        target_url = "https://www.olx.pl/d/oferta/iphone-14-pro-128gb-black-CID99-ID15UzJN.html"
-        target_found = False
+        # Already listed last cycle but above the limit - this is a price drop
+        previous_price = self.snapshot_price(search_url, link)
+        if previous_price is not None and previous_price > listing.price:
+            listing.previous_price = previous_price
         
-        print("\n[DEBUG] Current notified_listings.txt entries count:", len(self.notified_listings))
-        print("[DEBUG] Target URL in notified_listings?", target_url in self.notified_listings)
+        # The outbox row is the claim - whoever inserts it first sends the listing
+        if self.store is not None:
+            payload = listing.to_dict()
+            claimed = self.store.claim_notifications(
+                {key: {**payload, 'subscriber': subscriber['name'], 'chat_id': subscriber['chat_id']} for key, subscriber in pending.items()},
+                self.worker_id)
+            pending = {key: subscriber for key, subscriber in pending.items() if key in claimed}
+            if not pending:
+                if DEBUG:
+                    print(debug_msg + "claimed by another worker, skipping.")
+                return 0
         
-        for offer in offers:
-            if offer['link'] == target_url:
-                target_found = True
-                print(f"\n[DEBUG TARGET FOUND] {offer['title']} | {offer['price']} | {target_url}")
-                print(f"Phone model detected: {self.identify_phone_model(offer['title'])}")
-                print(f"Price extracted: {self.extract_price(offer['price'])}")
-                print(f"Already notified: {target_url in self.notified_listings}")
-                
-        if not target_found:
-            print(f"\n[DEBUG] Target listing not found in unfiltered offers: {target_url}")
-            
-        for offer in offers:
-            link = offer['link']
-            phone_model = self.identify_phone_model(offer['title'])
-            price = self.extract_price(offer['price'])
-            debug_msg = f"[DEBUG] {offer['title']} | {offer['price']} | {link} => "
-            if link in self.notified_listings:
-                print(debug_msg + "already notified, skipping.")
-            else:
-                # Only send notification if model is identified and price is within limit
-                eligible = False
-                model_for_limit = phone_model
-                if phone_model and price is not None and phone_model in self.price_limits and price <= self.price_limits[phone_model]:
-                    eligible = True
-                if eligible:
-                    # Always set phone_name to something meaningful
-                    phone_name = phone_model if phone_model else offer['title']
-                    listing = {
-                        'phone_name': phone_name,
-                        'price': price,
-                        'description': '',
-                        'link': link,
-                        'title': offer['title']
-                    }
-                    sent = self.send_telegram_notification(listing)
-                    if sent:
-                        print(debug_msg + f"notification sent! (Model: {phone_name})")
-                        self.notified_listings.add(link)
-                        self.save_notified_listings()
-                    else:
-                        print(debug_msg + "notification FAILED!")
-                    notified += 1
-                else:
-                    print(debug_msg + "not eligible for notification (model/price filter)")
-        return notified
+        # A large fan-out takes a while within Telegram's limits - polling goes on meanwhile
+        self.queue_listing(listing, pending)
+        return len(pending)
 
-    def check_direct_listing(self, url):
-        """Directly check a specific listing URL to see if it exists and extract details"""
-        print(f"\n[DEBUG] Checking direct listing URL: {url}")
+    def check_direct_listing(self, url, headers=None, request_pool=None):
+        """Directly check a specific listing URL to see if it exists and extract details.
+
+        Returns None if it couldn't be checked, {'exists': True, 'modified': False} for a 304 to a
+        conditional request, {'exists': False, 'modified': True} for an ad that's gone, and otherwise
+        the parsed details with the page's ETag and Last-Modified."""
+        if DEBUG:
+            print(f"\n[DEBUG] Checking direct listing URL: {url}")
         try:
-            # Rotate user agents to prevent blocking
-            self.headers['User-Agent'] = random.choice(self.user_agents)
-            response = requests.get(url, headers=self.headers, timeout=15)
-            
-            if response.status_code != 200:
+            response = (request_pool or self.request_pool).get(url, timeout=15, headers=headers)
+        except Exception as e:
+            print(f"Listing check failed for {url}: {e}")
+            return None
+        
+        if response.status_code == 304:
+            return {'exists': True, 'modified': False}
+        if response.status_code in (404, 410) or '/d/oferta/' not in response.url:
+            # Removed ads 404 or redirect to search results
+            return {'exists': False, 'modified': True}
+        if response.status_code != 200:
+            if DEBUG:
                 print(f"[DEBUG] Listing URL returned status code: {response.status_code}")
-                return None
-                
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Try to extract title
-            title_selectors = [
-                {'data-cy': 'ad_title'}, 
-                {'class': 'css-1soizd2'}, 
-                {'class': 'css-1juynto'},
-                {'class': re.compile(r'.*title.*', re.I)}
-            ]
-            title = None
-            for selector in title_selectors:
-                title_elem = soup.find(['h1', 'h2', 'h3'], selector)
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    break
-                    
-            # Try to extract price
-            price_selectors = [
-                {'data-testid': 'ad-price-container'},
-                {'class': re.compile(r'.*price.*', re.I)}
-            ]
-            price_text = None
-            for selector in price_selectors:
-                price_elem = soup.find(['div', 'h3', 'span'], selector)
-                if price_elem:
-                    price_text = price_elem.get_text(strip=True)
-                    break
-                    
-            if not title:
+            return None
+        
+        details = self.parse_listing_page(response.content)
+        if not details:
+            if DEBUG:
                 print(f"[DEBUG] Could not extract title from listing page")
-                return None
+            return None
+        
+        if DEBUG:
+            print(f"[DEBUG] Direct check decoded: Model={details['phone_model']}, Price={details['price']}")
+        details['modified'] = True
+        details['etag'] = response.headers.get('ETag')
+        details['last_modified'] = response.headers.get('Last-Modified')
+        return details
+
+    def parse_listing_page(self, content):
+        """Extract title, price and availability from a single listing page, or None if it has no title"""
+        soup = bs4.BeautifulSoup(content, 'html.parser')
+        
+        # Try to extract title
+        title_selectors = [
+            {'data-cy': 'ad_title'}, 
+            {'class': 'css-1soizd2'}, 
+            {'class': 'css-1juynto'},
+            {'class': re.compile(r'.*title.*', re.I)}
+        ]
+        title = None
+        for selector in title_selectors:
+            title_elem = soup.find(['h1', 'h2', 'h3'], selector)
+            if title_elem:
+                title = title_elem.get_text(strip=True)
+                break
                 
-            print(f"[DEBUG] Direct check results: Title='{title}', Price='{price_text}'")
-            
-            phone_model = self.identify_phone_model(title)
-            price = self.extract_price(price_text) if price_text else None
-            
-            print(f"[DEBUG] Direct check decoded: Model={phone_model}, Price={price}")
-            
-            return {
-                'exists': True,
-                'title': title,
-                'price_text': price_text,
-                'phone_model': phone_model,
-                'price': price
-            }
-            
-        except Exception as e:
-            print(f"[DEBUG] Error checking direct listing: {e}")
+        # Try to extract price
+        price_selectors = [
+            {'data-testid': 'ad-price-container'},
+            {'class': re.compile(r'.*price.*', re.I)}
+        ]
+        price_text = None
+        for selector in price_selectors:
+            price_elem = soup.find(['div', 'h3', 'span'], selector)
+            if price_elem:
+                price_text = price_elem.get_text(strip=True)
+                break
+                
+        if not title:
             return None
+        
+        # Sellers usually mark reservations in the title or description
+        description_elem = soup.find('div', {'data-cy': 'ad_description'})
+        description = description_elem.get_text(' ', strip=True) if description_elem else ''
+        reserved = bool(RESERVED_MARKERS.search(title) or RESERVED_MARKERS.search(description))
+        
+        # Ended ads still render, with a banner instead of the contact buttons
+        page_text = content.decode('utf-8', errors='replace') if isinstance(content, bytes) else content
+        active = not any(marker in page_text for marker in INACTIVE_MARKERS)
+        
+        return {
+            'exists': True,
+            'title': title,
+            'price_text': price_text,
+            'phone_model': self.identify_phone_model(title),
+            'price': self.extract_price(price_text) if price_text else None,
+            'active': active,
+            'reserved': reserved
+        }
+
+    def handle_watchlist_event(self, event):
+        """Print a watchlist change and forward it to Telegram"""
+        if event['type'] == 'price_changed':
+            text = f"💰 *Watched listing price changed:* {event['old_price']} zł → {event['price']} zł"
+        elif event['type'] == 'deactivated':
+            text = "🚫 *Watched listing is no longer active*"
+        elif event['type'] == 'reserved':
+            text = "⏳ *Watched listing is now reserved*"
+        elif event['type'] == 'unreserved':
+            text = "✅ *Watched listing is no longer reserved*"
+        else:
+            return
+        
+        print(f"👀 Watchlist: {event['type']} | {event['title']} | {event['url']}")
+        if self.telegram_enabled:
+            title = event['title'] or event['url']
+            self.run_telegram(lambda: self.send_telegram_text(f"{text}\n📱 {title}\n🔗 [View Listing]({event['url']})"))
     
+    def profiles_to_poll(self):
+        """All profiles, or in sharded mode the ones the coordinator assigned to this worker"""
+        if self.store is None:
+            return self.profiles()
+        
+        assigned = self.store.assigned_profiles(self.worker_id)
+        profiles = [profile for profile in self.profiles() if profile['name'] in assigned]
+        if not profiles:
+            print(f"Worker {self.worker_id}: no profiles assigned - waiting for the coordinator")
+        return profiles
+
+    def deliver_orphaned_notifications(self):
+        """Send notifications other workers claimed but never sent before they died"""
+        for key, payload in self.store.adopt_orphans(self.worker_id):
+            if key in self.sending:
+                continue  # ours, still queued
+            listing = Listing.from_dict(payload)
+            subscriber = {'name': payload.get('subscriber', DEFAULT_SUBSCRIBER), 'chat_id': payload.get('chat_id', self.chat_id)}
+            print(f"📮 Sending orphaned notification: {listing.title} | {listing.link} ({subscriber['name']})")
+            if self.deliver_listing(listing, {key: subscriber}).get(key):
+                self.store.mark_sent([key])
+                self.notified_listings[key] = time.time()
+                self.save_notified_listings([key])
+            else:
+                self.store.release([key])
+
+    def run_profile(self, profile):
+        """Poll one search profile: fetch, notify and diff against its previous snapshot"""
+        self.active_profile = profile
+        search_filters = self.profile_filters()
+        search_url = self.build_search_url()
+        if self.store is not None:
+            # Another worker may have polled this profile before a rebalance
+            watermark = self.store.watermark(search_url)
+            if watermark:
+                self.watermarks[search_url] = watermark
+        
+        print(f"Profile: {profile['name']}")
+        print(f"Searching for: {', '.join(search_filters.get('phone_models', [])) or search_filters['query']}")
+        print(f"Max distance: {search_filters.get('distance')} km")
+        print(f"Condition: {search_filters.get('condition')}")
+        print("-" * 40)
+        
+        # Deals are notified as they come out of the pipeline, in streaming mode while the page downloads
+        with self.stage('search'):
+            unfiltered_offers = self.poll_search(search_url)
+        if unfiltered_offers:
+            # Log the actual newest offers from the OLX page (unfiltered)
+            self.log_first10_unfiltered_offers(unfiltered_offers)
+            
+            # Diff after notifying so price drops can still be compared to last cycle
+            with self.stage('snapshot_diff'):
+                events = self.diff_search_snapshot(search_url, unfiltered_offers)
+                self.handle_snapshot_events(events)
+            
+            if self.archive is not None:
+                with self.stage('archive'):
+                    self.archive_offers(profile, unfiltered_offers, events)
+        else:
+            print("❌ No unfiltered offers found")
+
     def run(self):
         """Main method to run the scraper"""
         try:
             print("OLX iPhone Scraper Started")
             print("-" * 40)
-            print(f"Searching for: {', '.join(self.search_filters['phone_models'])}")
-            print(f"Max distance: {self.search_filters['distance']} km")
-            print(f"Condition: {self.search_filters['condition']}")
-            print("-" * 40)
             
-            # Debug - Test iPhone 12 Pro detection with the exact title
-            test_title = "iPhone 12 Pro 128GB"
-            detected_model = self.identify_phone_model(test_title)
-            print(f"\n[DEBUG] Testing model detection with '{test_title}'")
-            print(f"Detected model: {detected_model}")
-            if detected_model in self.price_limits:
-                print(f"Price limit for {detected_model}: {self.price_limits[detected_model]}")
-            else:
-                print(f"No price limit found for {detected_model}")
-            print("-" * 40)
+            # Fan-outs queued last cycle, recorded before anything is deduplicated against them
+            self.finish_deliveries()
+            if self.store is not None:
+                self.deliver_orphaned_notifications()
             
-            # Check the specific listing that's not being found
-            target_url = "https://www.olx.pl/d/oferta/iphone-14-pro-128gb-black-CID99-ID15UzJN.html"
-            direct_check = self.check_direct_listing(target_url)
-            if direct_check:
-                print(f"[DEBUG] Target listing direct check: {direct_check}")
-                # Check if eligible for notification based on price
-                if direct_check['phone_model'] and direct_check['price']:
-                    model = direct_check['phone_model']
-                    if model in self.price_limits and direct_check['price'] <= self.price_limits[model]:
-                        print(f"[DEBUG] Target listing IS eligible for notification!")
-                        if target_url not in self.notified_listings:
-                            print(f"[DEBUG] Target listing has NOT been notified before - should be notified!")
-                        else:
-                            print(f"[DEBUG] Target listing has already been notified before.")
-                    else:
-                        print(f"[DEBUG] Target listing price {direct_check['price']} exceeds limit of {self.price_limits.get(model, 'N/A')}")
-                else:
-                    print(f"[DEBUG] Could not determine model or price for direct listing check")
-            
-            # Log the 10 actual newest offers from the OLX page (unfiltered)
-            unfiltered_offers = self.get_first10_unfiltered_offers()
-            if unfiltered_offers:
-                self.log_first10_unfiltered_offers(unfiltered_offers)
-                # Notify for unfiltered offers if not already sent and matches filter
-                self.notify_unfiltered_newest()
-            else:
-                print("❌ No unfiltered offers found")
+            try:
+                profiles = self.profiles_to_poll()
+                if self.fetch_settings.get('mode') != 'streaming' and self.parser_settings.get('mode') == 'process_pool':
+                    with self.stage('prefetch'):
+                        self.prefetch_search_pages(profiles)
+                for profile in profiles:
+                    self.run_profile(profile)
+                    self.finish_deliveries()
+            finally:
+                self.active_profile = None
+                self.prefetched = {}
             
+            # Sweeps run in the background - only the changes they found are handled here
+            with self.stage('watchlist'):
+                self.watchlist.start()
+                events = self.watchlist.take_events()
+                for event in events:
+                    self.handle_watchlist_event(event)
+                if events:
+                    self.state_dirty = True
+            
+            with self.stage('state_save'):
+                self.prune_notified_listings()
+                self.save_state_snapshot()
+            
+        except (RequestPoolExhausted, requests.ConnectionError, requests.Timeout):
+            raise
         except Exception as e:
             print(f"ERROR in run method: {e}")
             if self.verbose:
@@ -936,8 +3696,31 @@ class OLXiPhoneScraper:
                 print(f"Traceback: {traceback.format_exc()}")
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Monitor OLX for iPhone deals")
+    parser.add_argument('--profile', action='store_true', help="sample CPU stacks and trace allocations per cycle")
+    parser.add_argument('--profile-every', type=int, default=1, metavar='N', help="profile every Nth cycle (default: every cycle)")
+    parser.add_argument('--profile-dir', default='profiles', help="where folded stacks and reports are written")
+    parser.add_argument('--profile-interval', type=float, default=5.0, metavar='MS', help="stack sampling interval in milliseconds")
+    # The ID names the worker's snapshot, history and archive files, so it must survive restarts
+    parser.add_argument('--worker', nargs='?', const=platform.node(), metavar='ID',
+                        help="sharded mode: poll only the search profiles the coordinator assigns to this worker "
+                             "(ID defaults to the hostname - give each worker on one host its own)")
+    parser.add_argument('--coordinator', action='store_true', help="assign search profiles to the live sharded workers")
+    args = parser.parse_args()
+    
     try:
-        scraper = OLXiPhoneScraper()
+        scraper = OLXiPhoneScraper(worker_id=args.worker)
+        if args.coordinator:
+            # Runs until Ctrl+C
+            ShardCoordinator(scraper).run()
+        if args.worker:
+            print(f"🧩 Worker {args.worker} using shared store {scraper.cluster_settings['store']}")
+            scraper.start_heartbeat()
+        if args.profile:
+            scraper.profiler = CycleProfiler(args.profile_dir, every=args.profile_every, interval=args.profile_interval / 1000)
+            print(f"🔬 Profiling every {scraper.profiler.every} cycle(s) into {args.profile_dir}/")
         
         print("🔍 Starting OLX iPhone monitoring...")
         print("Press Ctrl+C to stop.")
@@ -949,19 +3732,40 @@ if __name__ == "__main__":
                 print(f"\nCycle #{cycle} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
                 print("-" * 30)
                 
-                scraper.run()
+                # Pick up config.json edits without restarting
+                scraper.reload_config_if_changed()
+                
+                if scraper.profiler is not None:
+                    scraper.profiler.start_cycle(cycle)
+                try:
+                    scraper.run()
+                finally:
+                    if scraper.profiler is not None:
+                        scraper.profiler.end_cycle()
+                
+                if cycle == 1:
+                    scraper.mark_startup('first cycle done')
+                    scraper.print_startup_report()
                 
                 wait_time = random.uniform(10, 20)  # Random wait between 20-30 seconds
+                # No point polling before at least one identity has recovered from backoff
+                wait_time = max(wait_time, scraper.request_pool.seconds_until_available())
                 print(f"\nCycle #{cycle} completed. Waiting {wait_time:.1f} seconds...")
                 print("=" * 50)
 
                 cycle += 1
-                time.sleep(wait_time)  # Wait for the random interval
+                # Record notifications as they go out rather than at the start of the next cycle
+                wait_until = time.time() + wait_time
+                scraper.finish_deliveries(timeout=wait_time)
+                time.sleep(max(0, wait_until - time.time()))  # Wait for the random interval
                 
-            except requests.exceptions.RequestException as e:
+            except (requests.exceptions.RequestException, RequestPoolExhausted) as e:
+                # Blocked identities are already backing off in the pool, so only wait
+                # until the next healthy one is available instead of a flat minute
+                retry_in = max(5, scraper.request_pool.seconds_until_available())
                 print(f"\n🌐 Network error in cycle #{cycle}: {e}")
-                print("Retrying in 60 seconds...")
-                time.sleep(60)
+                print(f"Retrying in {retry_in:.0f} seconds...")
+                time.sleep(retry_in)
                 continue
             except Exception as e:
                 print(f"\n⚠️ Error in cycle #{cycle}: {e}")
@@ -976,4 +3780,15 @@ if __name__ == "__main__":
         import traceback
         print(f"Traceback:\n{traceback.format_exc()}")
     finally:
+        if 'scraper' in globals():
+            scraper.stop_sender()
+            scraper.shutdown_parser_pool()
+            scraper.watchlist.shutdown()
+            scraper.stop_query_api()
+            scraper.stop_heartbeat()
+            if scraper.store is not None:
+                if scraper.worker_id:
+                    # Leave right away so the coordinator doesn't wait out the heartbeat TTL
+                    scraper.store.remove_worker(scraper.worker_id)
+                scraper.store.close()
         print("\n🏁 Program terminated.")
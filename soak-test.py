@@ -0,0 +1,609 @@
+# Local soak-test harness for olx-monitor-new.py
+#
+# Runs the real scraper against a fake OLX server and a fake Telegram Bot API
+# server on localhost, so load and long-running behaviour can be measured
+# without touching olx.pl or the real chat in config.json.
+#
+#   python soak-test.py --duration 7200 --new-per-minute 10 --telegram-429-rate 0.05
+import argparse
+import contextlib
+import gzip
+import http.server
+import importlib
+import importlib.abc
+import importlib.util
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from datetime import datetime, timedelta
+
+MONITOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'olx-monitor-new.py')
+
+FAKE_BOT_TOKEN = '123456:SOAK-TEST'
+FAKE_CHAT_ID = '1000'
+
+STORAGE_OPTIONS = ['64GB', '128GB', '256GB', '512GB']
+COLOURS = ['czarny', 'biały', 'niebieski', 'grafitowy', 'złoty', 'fioletowy']
+DISTRICTS = ['Wola', 'Mokotów', 'Ochota', 'Bemowo', 'Praga-Południe', 'Targówek', 'Ursynów']
+
+
+class MonitorFinder(importlib.abc.MetaPathFinder):
+    """Makes olx-monitor-new.py importable as olx_monitor (its name isn't a valid module name).
+
+    Installed at import time so spawned parser-pool workers, which re-import this
+    script, can unpickle tasks that reference olx_monitor too."""
+    def find_spec(self, name, path, target=None):
+        if name == 'olx_monitor':
+            return importlib.util.spec_from_file_location(name, MONITOR_PATH)
+        return None
+
+
+sys.meta_path.append(MonitorFinder())
+
+
+def load_monitor():
+    """Import olx-monitor-new.py as olx_monitor"""
+    return importlib.import_module('olx_monitor')
+
+
+def monitor_defaults():
+    """The monitor's built-in settings, read in a scratch directory so no config.json or state file is touched"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='olx-soak-defaults-') as scratch:
+        os.chdir(scratch)
+        try:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                return load_monitor().OLXiPhoneScraper().default_settings
+        finally:
+            os.chdir(cwd)
+
+
+def worker_cpu_seconds(scraper):
+    """CPU seconds used so far by each live parser pool worker process, by pid (Linux)"""
+    processes = getattr(scraper.parser_pool, '_processes', None) or {}
+    seconds = {}
+    for pid in list(processes):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                # utime and stime, in clock ticks, are the 14th and 15th fields
+                fields = f.read().rsplit(')', 1)[1].split()
+            seconds[pid] = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        except (OSError, ValueError, IndexError):
+            continue
+    return seconds
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux), or None"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return None
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class FakeOLX:
+    """Generates listings over time and serves search and listing pages in the current OLX markup"""
+    PAGE_SIZE = 50
+    PROMOTED_SLOTS = (0, 1, 2, 13, 14, 15)
+    BADGE_CLASS = 'css-qavd0c'
+
+    def __init__(self, price_limits, new_per_minute, sold_per_minute, deal_ratio, padding_kb):
+        self.price_limits = price_limits
+        self.new_per_minute = new_per_minute
+        self.sold_per_minute = sold_per_minute
+        self.deal_ratio = deal_ratio
+        self.padding = ('<script>/*' + 'x' * 1022 + '*/</script>\n') * padding_kb
+
+        self.lock = threading.Lock()
+        self.listings = []  # newest last
+        self.by_id = {}
+        self.next_id = 1_000_000
+        self.requests = {'search': 0, 'listing': 0, 'not_modified': 0}
+        self.stopped = threading.Event()
+
+    def new_listing(self, created_at, seeded=False):
+        model = random.choice(list(self.price_limits))
+        limit = self.price_limits[model]
+        is_deal = random.random() < self.deal_ratio
+        price = int(limit * (random.uniform(0.6, 1.0) if is_deal else random.uniform(1.1, 2.5)))
+
+        self.next_id += 1
+        listing_id = base36(self.next_id)
+        title = f"{model} {random.choice(STORAGE_OPTIONS)} {random.choice(COLOURS)}"
+        slug = re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
+        listing = {
+            'id': listing_id,
+            'title': title,
+            'model': model,
+            'price': price,
+            'eligible': price <= limit,
+            'path': f"/d/oferta/{slug}-CID99-ID{listing_id}.html",
+            'district': random.choice(DISTRICTS),
+            'created_at': created_at,
+            'seeded': seeded,
+            'sold': False
+        }
+        self.listings.append(listing)
+        self.by_id[listing_id] = listing
+        return listing
+
+    def seed(self, count):
+        now = time.time()
+        with self.lock:
+            for i in range(count):
+                self.new_listing(now - (count - i) * 300, seeded=True)
+
+    def generate_forever(self):
+        """Poisson arrivals of new listings and sales"""
+        new_rate = self.new_per_minute / 60
+        sold_rate = self.sold_per_minute / 60
+        while not self.stopped.is_set():
+            time.sleep(0.1)
+            with self.lock:
+                if new_rate and random.random() < new_rate * 0.1:
+                    self.new_listing(time.time())
+                if sold_rate and random.random() < sold_rate * 0.1:
+                    active = [listing for listing in self.listings[-self.PAGE_SIZE:] if not listing['sold']]
+                    if active:
+                        random.choice(active)['sold'] = True
+
+    def search_page(self):
+        with self.lock:
+            active = [listing for listing in reversed(self.listings) if not listing['sold']]
+        regular = active[:self.PAGE_SIZE]
+        older = active[self.PAGE_SIZE:] or regular
+
+        # Promoted ads are pinned at fixed slots and rotate between requests
+        page = list(regular)
+        promoted_ids = set()
+        for slot in self.PROMOTED_SLOTS:
+            promoted = random.choice(older)
+            promoted_ids.add(promoted['id'])
+            page.insert(min(slot, len(page)), promoted)
+        page = page[:self.PAGE_SIZE + len(self.PROMOTED_SLOTS)]
+
+        cards = []
+        badge_style_sent = False
+        for listing in page:
+            is_promoted = listing['id'] in promoted_ids
+            badge = ''
+            if is_promoted:
+                # Emotion only emits a style rule the first time it is used on a page
+                style = '' if badge_style_sent else (
+                    f"<style data-emotion=\"css qavd0c\">.{self.BADGE_CLASS}{{position:absolute;}}"
+                    f".{self.BADGE_CLASS}::after{{content:'Wyróżnione';}}</style>")
+                badge_style_sent = True
+                badge = f'{style}<div class="{self.BADGE_CLASS}"></div>'
+            cards.append(self.card_html(listing, badge))
+
+        state = {'listing': {'listing': {'ads': [self.state_ad(listing, listing['id'] in promoted_ids) for listing in page]}}}
+        return (
+            '<!doctype html><html><head><meta charset="utf-8"/><title>iphone - Warszawa</title></head><body>'
+            '<div data-testid="listing-grid">' + ''.join(cards) + '</div>'
+            + self.padding +
+            '<script>window.__PRERENDERED_STATE__= ' + json.dumps(json.dumps(state)) + ';\n</script>'
+            '</body></html>'
+        )
+
+    def card_html(self, listing, badge):
+        created = datetime.fromtimestamp(listing['created_at'])
+        return (
+            f'<div class="css-l9drzq" data-cy="l-card" data-testid="l-card" id="{listing["id"]}">'
+            '<style data-emotion="css qfzx1y">.css-qfzx1y{height:168px;padding:8px;}</style>'
+            '<div class="css-qfzx1y"><div class="css-1g5933j" type="list">'
+            f'<div class="css-1ut25fa" type="list"><a class="css-1tqlkj0" href="{listing["path"]}">'
+            f'<div class="css-x7ghln"><img alt="{listing["title"]}" src="/img/{listing["id"]}.jpg"/></div>{badge}</a></div>'
+            '<div class="css-1apmciz"><div data-cy="ad-card-title" class="css-u2ayx9">'
+            f'<a class="css-1tqlkj0" href="{listing["path"]}"><h4 class="css-1g61gc2">{listing["title"]}</h4></a>'
+            f'<p data-testid="ad-price" class="css-uj7mm0">{format_price(listing["price"])}</p></div>'
+            f'<p data-testid="location-date" class="css-vbz67q">Warszawa, {listing["district"]} - Dzisiaj o {created:%H:%M}</p>'
+            '</div></div></div></div>'
+        )
+
+    def state_ad(self, listing, promoted):
+        return {
+            'id': listing['id'],
+            'title': listing['title'],
+            'url': 'https://www.olx.pl' + listing['path'],
+            'isPromoted': promoted,
+            'createdTime': datetime.fromtimestamp(listing['created_at']).isoformat(),
+            'price': {'displayValue': format_price(listing['price']), 'regularPrice': {'value': listing['price'], 'currencyCode': 'PLN'}},
+            'location': {'cityName': 'Warszawa', 'districtName': listing['district']}
+        }
+
+    def listing_page(self, listing):
+        ended = '<div>Ogłoszenie nie jest już dostępne</div>' if listing['sold'] else ''
+        return (
+            '<!doctype html><html><head><meta charset="utf-8"/></head><body>'
+            f'<h1 data-cy="ad_title" class="css-1soizd2">{listing["title"]}</h1>'
+            f'<div data-testid="ad-price-container"><h3 class="css-12vqlj3">{format_price(listing["price"])}</h3></div>'
+            f'<div data-cy="ad_description"><div>Sprzedam {listing["title"]}, stan bardzo dobry.</div></div>{ended}'
+            '</body></html>'
+        )
+
+    def handler(self):
+        olx = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                path = urllib.parse.urlparse(self.path).path
+                if path.startswith('/d/oferta/'):
+                    match = re.search(r'-ID(\w+)\.html', path)
+                    listing = olx.by_id.get(match.group(1)) if match else None
+                    if listing is None:
+                        return self.reply(404, b'')
+                    olx.requests['listing'] += 1
+                    body = olx.listing_page(listing).encode('utf-8')
+                    etag = f'"{hash(body) & 0xffffffff:x}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        olx.requests['not_modified'] += 1
+                        return self.reply(304, b'', {'ETag': etag})
+                    return self.reply(200, body, {'ETag': etag})
+
+                olx.requests['search'] += 1
+                return self.reply(200, olx.search_page().encode('utf-8'))
+
+            def reply(self, status, body, headers=None):
+                if body and 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+                    body = gzip.compress(body, compresslevel=5)
+                    headers = {**(headers or {}), 'Content-Encoding': 'gzip'}
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Streaming mode hangs up once it has read enough cards
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class FakeTelegram:
+    """Minimal Bot API server that records sendMessage calls and can answer with 429s"""
+    LINK = re.compile(r'\((https?://[^)]+)\)')
+
+    def __init__(self, rate_429):
+        self.rate_429 = rate_429
+        self.lock = threading.Lock()
+        self.messages = []  # (received_at, text)
+        self.rejected = 0
+        self.message_id = 0
+
+    def handler(self):
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                method = self.path.rstrip('/').rsplit('/', 1)[-1]
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length).decode('utf-8', errors='replace')
+                if 'json' in (self.headers.get('Content-Type') or ''):
+                    params = json.loads(raw or '{}')
+                else:
+                    params = {key: values[0] for key, values in urllib.parse.parse_qs(raw).items()}
+
+                if method == 'getMe':
+                    return self.reply(200, {'ok': True, 'result': {'id': 1, 'is_bot': True, 'first_name': 'Soak', 'username': 'soak_bot'}})
+                if method != 'sendMessage':
+                    return self.reply(200, {'ok': True, 'result': True})
+
+                if random.random() < fake.rate_429:
+                    with fake.lock:
+                        fake.rejected += 1
+                    return self.reply(429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after 1',
+                                            'parameters': {'retry_after': 1}})
+
+                with fake.lock:
+                    fake.message_id += 1
+                    fake.messages.append((time.time(), params.get('text', '')))
+                    message_id = fake.message_id
+                return self.reply(200, {'ok': True, 'result': {
+                    'message_id': message_id, 'date': int(time.time()),
+                    'chat': {'id': int(params.get('chat_id', FAKE_CHAT_ID)), 'type': 'private'},
+                    'text': params.get('text', '')
+                }})
+
+            do_GET = do_POST
+
+            def reply(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def notified_links(self):
+        """First time each listing link was delivered"""
+        first = {}
+        with self.lock:
+            for received_at, text in self.messages:
+                for link in self.LINK.findall(text):
+                    first.setdefault(link, received_at)
+        return first
+
+
+def base36(number):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    out = ''
+    while number:
+        number, rest = divmod(number, 36)
+        out = digits[rest] + out
+    return out or '0'
+
+
+def format_price(price):
+    return f"{price:,}".replace(',', ' ') + ' zł'
+
+
+def serve(handler_class):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class SoakDriver:
+    """Runs the real scraper cycle by cycle and collects timing, latency and memory figures"""
+    def __init__(self, args, olx, telegram, olx_port, telegram_port):
+        self.args = args
+        self.olx = olx
+        self.telegram = telegram
+        self.olx_port = olx_port
+        self.telegram_port = telegram_port
+        self.cycles = []  # (wall seconds, main process cpu seconds, parser worker cpu seconds)
+        self.memory = []  # (elapsed seconds, rss MB, traced MB)
+
+    def write_config(self, defaults):
+        search_filters = dict(defaults['search_filters'])
+        search_filters['base_url'] = f'http://127.0.0.1:{self.olx_port}/elektronika/telefony/warszawa/'
+        config = {
+            'telegram': {
+                'bot_token': FAKE_BOT_TOKEN,
+                'chat_id': FAKE_CHAT_ID,
+                'enabled': True,
+                'api_base_url': f'http://127.0.0.1:{self.telegram_port}/bot'
+            },
+            'notification_settings': {'max_message_length': 4000, 'include_description': True},
+            'search_filters': search_filters,
+            'search_profiles': self.search_profiles(),
+            'price_limits': defaults['price_limits'],
+            'logging_enabled': False,
+            'verbose': self.args.verbose,
+            'parser_settings': {'mode': self.args.parser_mode},
+            'fetch_settings': {'mode': self.args.fetch_mode}
+        }
+        with open('config.json', 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=4, ensure_ascii=False)
+
+    def search_profiles(self):
+        """--profiles N: N searches with their own URLs (fake OLX serves the same listings on every one)"""
+        if self.args.profiles <= 1:
+            return []
+        return [{'name': f'soak-{i}', 'base_url': f'http://127.0.0.1:{self.olx_port}/elektronika/telefony/soak-{i}/'}
+                for i in range(self.args.profiles)]
+
+    def run(self, monitor_log):
+        args = self.args
+        with contextlib.redirect_stdout(monitor_log):
+            monitor = load_monitor()
+            scraper = monitor.OLXiPhoneScraper()
+
+        if args.tracemalloc:
+            tracemalloc.start()
+
+        started = time.time()
+        next_report = started + args.report_every
+        cycle = 0
+        try:
+            while time.time() - started < args.duration:
+                cycle += 1
+                wall_start = time.perf_counter()
+                cpu_start = time.process_time()
+                workers_start = worker_cpu_seconds(scraper)
+                with contextlib.redirect_stdout(monitor_log):
+                    print(f"\nCycle #{cycle} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                    scraper.reload_config_if_changed()
+                    scraper.run()
+                workers_end = worker_cpu_seconds(scraper)
+                worker_cpu = sum(seconds - workers_start.get(pid, 0.0) for pid, seconds in workers_end.items())
+                self.cycles.append((time.perf_counter() - wall_start, time.process_time() - cpu_start, worker_cpu))
+
+                if time.time() >= next_report:
+                    self.sample_memory(started)
+                    self.print_report(started, final=False)
+                    next_report += args.report_every
+
+                # Like the monitor's main loop, record notifications while waiting for the next cycle
+                wait_until = time.time() + args.cycle_interval
+                with contextlib.redirect_stdout(monitor_log):
+                    scraper.finish_deliveries(timeout=args.cycle_interval)
+                time.sleep(max(0, wait_until - time.time()))
+        except KeyboardInterrupt:
+            print("\nSoak test interrupted")
+        finally:
+            self.sample_memory(started)
+            with contextlib.redirect_stdout(monitor_log):
+                scraper.stop_sender()
+                scraper.shutdown_parser_pool()
+                scraper.watchlist.shutdown()
+
+        return self.print_report(started, final=True)
+
+    def sample_memory(self, started):
+        traced = tracemalloc.get_traced_memory()[0] / (1024 * 1024) if tracemalloc.is_tracing() else None
+        self.memory.append((time.time() - started, current_rss_mb(), traced))
+
+    def latencies(self, started):
+        """Detection latency for every eligible listing published after the soak started"""
+        delivered = self.telegram.notified_links()
+        # Many profiles make a cycle, and so the detection window, longer
+        longest_cycle = max((wall for wall, _, _ in self.cycles), default=0.0)
+        latencies = []
+        missed = 0
+        with self.olx.lock:
+            listings = list(self.olx.listings)
+        for listing in listings:
+            if listing['seeded'] or not listing['eligible'] or listing['created_at'] < started:
+                continue
+            received_at = delivered.get('https://www.olx.pl' + listing['path'])
+            if received_at is None:
+                # Still inside the normal detection window - not missed yet
+                if time.time() - listing['created_at'] > (self.args.cycle_interval + longest_cycle) * 3 + 30:
+                    missed += 1
+                continue
+            latencies.append(received_at - listing['created_at'])
+        return latencies, missed
+
+    def print_report(self, started, final):
+        elapsed = time.time() - started
+        walls = [wall for wall, _, _ in self.cycles]
+        cpus = [main + workers for _, main, workers in self.cycles]
+        cpu_total = sum(cpus)
+        worker_cpu_total = sum(workers for _, _, workers in self.cycles)
+        latencies, missed = self.latencies(started)
+        rss = [mb for _, mb, _ in self.memory if mb is not None]
+        traced = [mb for _, _, mb in self.memory if mb is not None]
+
+        report = {
+            'elapsed_seconds': round(elapsed, 1),
+            'cycles': len(self.cycles),
+            'cycle_wall_ms': {
+                'mean': round(statistics.mean(walls) * 1000, 1) if walls else None,
+                'p95': round(percentile(walls, 95) * 1000, 1) if walls else None,
+                'max': round(max(walls) * 1000, 1) if walls else None
+            },
+            # CPU figures include the parser pool's worker processes
+            'cycle_cpu_ms_mean': round(statistics.mean(cpus) * 1000, 1) if cpus else None,
+            'parser_worker_cpu_share': round(worker_cpu_total / cpu_total, 2) if cpu_total else None,
+            'cores_busy': round(cpu_total / sum(walls), 2) if walls and sum(walls) else None,
+            'cycles_per_cpu_second': round(len(self.cycles) / cpu_total, 2) if cpu_total else None,
+            'search_pages_per_cpu_second': round(self.olx.requests['search'] / cpu_total, 2) if cpu_total else None,
+            'profiles': max(1, self.args.profiles),
+            # Profiles one fully busy core could keep polling at this cycle interval
+            'profiles_per_core': round(max(1, self.args.profiles) * elapsed / cpu_total, 1) if cpu_total else None,
+            'detection_latency_s': {
+                'count': len(latencies),
+                'p50': round(percentile(latencies, 50), 2) if latencies else None,
+                'p95': round(percentile(latencies, 95), 2) if latencies else None,
+                'max': round(max(latencies), 2) if latencies else None
+            },
+            'missed_eligible_listings': missed,
+            'listings_published': sum(1 for listing in self.olx.listings if not listing['seeded']),
+            'telegram_messages': len(self.telegram.messages),
+            'telegram_429s_injected': self.telegram.rejected,
+            'olx_requests': dict(self.olx.requests),
+            'rss_mb': {
+                'start': round(rss[0], 1) if rss else None,
+                'end': round(rss[-1], 1) if rss else None,
+                'growth_per_hour': round((rss[-1] - rss[0]) / max(elapsed / 3600, 1e-9), 1) if len(rss) > 1 else None
+            },
+            'traced_python_heap_mb_end': round(traced[-1], 1) if traced else None
+        }
+
+        title = "Final soak report" if final else f"Soak progress after {timedelta(seconds=int(elapsed))}"
+        print(f"\n📊 {title}")
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test the OLX monitor against local fake OLX and Telegram servers")
+    parser.add_argument('--duration', type=float, default=600, help="seconds to run (default 600)")
+    parser.add_argument('--cycle-interval', type=float, default=2, help="seconds between cycles (default 2)")
+    parser.add_argument('--new-per-minute', type=float, default=6, help="new listings published per minute")
+    parser.add_argument('--sold-per-minute', type=float, default=1, help="listings removed per minute")
+    parser.add_argument('--deal-ratio', type=float, default=0.3, help="share of new listings under their price limit")
+    parser.add_argument('--seed-listings', type=int, default=200, help="listings that exist before the soak starts")
+    parser.add_argument('--page-padding-kb', type=int, default=200, help="filler after the cards, like OLX's scripts")
+    parser.add_argument('--telegram-429-rate', type=float, default=0.0, help="share of sendMessage calls answered with 429")
+    parser.add_argument('--fetch-mode', choices=('streaming', 'buffered'), default='streaming')
+    parser.add_argument('--parser-mode', choices=('inline', 'process_pool'), default='inline')
+    parser.add_argument('--profiles', type=int, default=1, metavar='N', help="search profiles to poll each cycle (default 1)")
+    parser.add_argument('--report-every', type=float, default=60, help="seconds between progress reports")
+    parser.add_argument('--tracemalloc', action='store_true', help="also track the Python heap (slower)")
+    parser.add_argument('--verbose', action='store_true', help="keep the monitor's verbose output in monitor.log")
+    parser.add_argument('--workdir', help="new or empty directory for config/state files (default: a new temp dir)")
+    parser.add_argument('--report', help="write the final report as JSON to this file")
+    args = parser.parse_args()
+
+    report_path = os.path.abspath(args.report) if args.report else None
+    if args.workdir:
+        workdir = os.path.abspath(args.workdir)
+        # The run writes its own config.json and dedup state there, so it must never be a live install
+        if os.path.exists(workdir) and (not os.path.isdir(workdir) or os.listdir(workdir)):
+            parser.error(f"--workdir {args.workdir} must be a new or empty directory")
+        os.makedirs(workdir, exist_ok=True)
+    else:
+        workdir = tempfile.mkdtemp(prefix='olx-soak-')
+
+    # Filters and price limits come from the monitor's own defaults so eligibility matches
+    defaults = monitor_defaults()
+    price_limits = defaults['price_limits']
+    os.chdir(workdir)
+
+    olx = FakeOLX(price_limits, args.new_per_minute, args.sold_per_minute, args.deal_ratio, args.page_padding_kb)
+    olx.seed(args.seed_listings)
+    telegram = FakeTelegram(args.telegram_429_rate)
+    olx_server = serve(olx.handler())
+    telegram_server = serve(telegram.handler())
+    threading.Thread(target=olx.generate_forever, daemon=True).start()
+
+    driver = SoakDriver(args, olx, telegram, olx_server.server_port, telegram_server.server_port)
+    driver.write_config(defaults)
+
+    print(f"🧪 Soak test in {workdir}")
+    print(f"   fake OLX on :{olx_server.server_port}, fake Telegram on :{telegram_server.server_port}")
+    print(f"   {args.duration:.0f}s, cycle every {args.cycle_interval}s, {args.new_per_minute}/min new, "
+          f"{args.telegram_429_rate:.0%} Telegram 429s, {args.profiles} profile(s), fetch={args.fetch_mode}, parser={args.parser_mode}")
+    print("   monitor output goes to monitor.log")
+
+    with open('monitor.log', 'w', encoding='utf-8') as monitor_log:
+        report = driver.run(monitor_log)
+
+    olx.stopped.set()
+    olx_server.shutdown()
+    telegram_server.shutdown()
+
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()